@@ -0,0 +1,100 @@
+"""
+Title: Fly Shaker Command Line Runner
+Author: Johnny Duong
+Creation Date: Oct 18th, 2026
+
+Description:
+Runs an experiment without the GUI, from an experiment config file (JSON, or TOML with Python 3.11 or newer).
+Only imports numpy and the audio backend (pygame), no PySimpleGUI, OpenCV or matplotlib,
+so it starts quickly and can run unattended (e.g. over SSH or from a scheduled task) without a desktop session.
+Use the null or WAV file output on a machine without a sound card.
+
+Keys left out of the config file get the GUI's default values (module_experiment.DEFAULT_CONFIG),
+see module_experiment.py for the keys. Example config: experiment_config.json
+
+Usage:
+    python -m FlyShakerCLI experiment_config.json
+    python -m FlyShakerCLI experiment_config.json --output wav --path experiment.wav --fast
+
+Ctrl+C (or a kill, SIGTERM) stops the experiment right away, like the GUI's Stop Experiment button.
+"""
+
+import argparse
+import os
+import signal
+import sys
+import threading
+
+# Hide pygame's "Hello from the pygame community" message, keeps the output (and logs) clean
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import module_experiment as E
+import module_wave_gen as W
+
+
+def get_args(argv=None):
+    # Command line arguments, the output options replace the config file's "output"
+    parser = argparse.ArgumentParser(prog="python -m FlyShakerCLI",
+                                     description="Runs a Fly Shaker experiment from a config file, without the GUI.")
+    parser.add_argument("config", help="experiment config file (.json or .toml)")
+    parser.add_argument("--output", choices=sorted(W.AUDIO_ENGINES),
+                        help="audio output (backend), replaces the config's output")
+    parser.add_argument("--path", help=f"WAV file of the wav output (default: {W.WAV_FILE_DEFAULT})")
+    parser.add_argument("--fast", action="store_true",
+                        help="null and wav outputs write audio as fast as possible instead of in real time "
+                             "(ignored by the speaker outputs)")
+    parser.add_argument("--seed", type=int,
+                        help="seed of the random burst periods (e.g. from a saved schedule), replaces the config's seed")
+    return parser.parse_args(argv)
+
+
+def get_config(args):
+    # Experiment config from the config file and the command line's output options
+    config = E.load_config(args.config)
+
+    if args.seed is not None:
+        config["seed"] = args.seed
+
+    if args.output is not None:
+        config["output"] = {"backend": args.output}
+    output = config["output"]
+    if args.path is not None:
+        output["path"] = args.path
+    # Only the null and WAV file outputs have a speed (same as the GUI), the speakers always play in real time
+    if args.fast and output["backend"] in (W.AUDIO_BACKEND_NULL, W.AUDIO_BACKEND_WAV):
+        output["speed"] = None
+    # Only the WAV file output has a path
+    if output["backend"] != W.AUDIO_BACKEND_WAV:
+        output.pop("path", None)
+    return config
+
+
+def main(argv=None):
+    args = get_args(argv)
+    try:
+        config = get_config(args)
+    except (OSError, ValueError) as error:
+        # ValueError includes JSON errors (json.JSONDecodeError)
+        print(f"Could not read config file {args.config}: {error}", file=sys.stderr)
+        return 1
+    print("Experiment config:", config)
+
+    # Ctrl+C (SIGINT) and kill (SIGTERM) set stop_event, which ends the experiment's current wait right away
+    stop_event = threading.Event()
+
+    def stop_experiment(signum, frame):
+        print("Stopping experiment, signal", signum)
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, stop_experiment)
+    signal.signal(signal.SIGTERM, stop_experiment)
+
+    try:
+        E.run_experiment(config, stop_event)
+    finally:
+        W.audio_engine.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
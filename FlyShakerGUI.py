@@ -18,13 +18,26 @@ https://www.pysimplegui.org/en/latest/cookbook/#recipe-collapsible-sections-visi
 https://stackoverflow.com/questions/61006988/hiding-and-unhiding-text-input-and-filebrowse-in-pysimplegui
 https://www.pysimplegui.org/en/latest/call%20reference/#input-element
 
--Preview wave form?
 -Change duration so it can be float? How to check for floating values in str?
 -Play audio sample for x seconds regardless of length? (1 seconds)
 https://stackoverflow.com/questions/736043/checking-if-a-string-can-be-converted-to-float-in-python
 https://www.geeksforgeeks.org/python-check-for-float-string/
 
 Changelog:
+10-18-2026: Random Burst periods are drawn with a seed when the experiment starts (uniform, exponential or Poisson,
+           millisecond resolution), the seed and the schedule are saved to a JSON file.
+10-18-2026: Added Experiment Progress dashboard (elapsed/remaining time, bursts, next burst, on time percentage).
+10-18-2026: Added Preview of the wave and of the whole experiment's bursts/silences (no matplotlib window).
+10-18-2026: Wave is rendered in the background after the specifications are edited, Play starts right away.
+10-18-2026: Input boxes are checked when changed (events) instead of 100 times a second, GUI idles at ~0% CPU.
+10-18-2026: Faster startup: removed unused imports, multiprocessing and matplotlib are only imported when used.
+10-18-2026: Experiment runs in its own process, specifications are put into a dictionary (experiment config).
+10-18-2026: Experiment runs in a background worker that reports progress to the GUI (GUI never freezes).
+10-18-2026: Experiment runs in a thread, Stop Experiment (or spacebar) stops it right away, OpenCV no longer needed.
+10-18-2026: Bursts start at absolute deadlines from the start of the experiment (no drift), lateness is printed.
+10-18-2026: Added Audio Output (speakers, streamed speakers, none or WAV file), runs without audio hardware.
+10-18-2026: Bursts and silences are queued back to back (gapless), spacebar now stops the experiment right away.
+10-18-2026: Added Sweep wave type (smooth linear/logarithmic chirp or stepped sweep), always streamed.
 4-8-2023: Made Pulse Specs match Sine Specs, added in Duty Cycle. Added in Random Burst checkbox and code.
           Added in updated Pulse Spec image to match Sine more.
           Updated module_wave_gen with test code and more functions for flexibility.
@@ -51,17 +64,12 @@ https://stackoverflow.com/questions/65923933/pysimplegui-set-and-get-the-cursor-
 
 """
 
-import cv2
 import os
 import PySimpleGUI as sg
-import random
-import threading
-import time
-
-from multiprocessing import Process
 
 # Import modules
 import module_wave_gen as W
+import module_experiment as E
 
 # Get full directory of where this file is, used for image loading.
 sourceFileDir = os.path.dirname(os.path.abspath(__file__))
@@ -71,11 +79,19 @@ imgFolderDir = "img"
 # RADIO TEXT/KEYs
 SINE = 'Sine'
 PULSE = 'Pulse'
+SWEEP = 'Sweep'
 GROUP_ID = "RADIO1"
 
 # CHECKBOX KEY
 RANDOM_BURST_KEY = "-=RANDOM BURST=-"
 
+# Random Burst settings (see E.get_burst_schedule()).
+# COMBO KEY, distribution of the random burst periods
+RANDOM_DIST_KEY = "-RANDOM DIST-"
+RANDOM_DIST_DEF = E.BURST_UNIFORM
+# INPUT KEY, seed of the random burst periods, empty for a new seed every experiment (saved with the schedule)
+SEED_KEY = "-SEED-"
+
 # -----------------------
 # SINE SPECIFICATIONS
 # -----------------------
@@ -150,6 +166,31 @@ PULSE_DEFAULTS = [PULSE_FREQ_DEF, AMP_P_DEF, DUTY_CYCLE_DEF, DUR_P_DEF, BURST_P_
 # Note: If you change the "img" folder name or location, this will crash the GUI.
 PULSE_IMG = os.path.join(sourceFileDir, imgFolderDir, 'pulse_wave2.png')
 
+# -----------------------
+# SWEEP SPECIFICATIONS
+# -----------------------
+# Note: "SW" means "Sweep", "DEF" means "Default Value"
+# Sweep is a sine wave going from the Start to the Stop frequency over the Duration.
+# If Step is 0 Hz, the frequency glides smoothly (chirp), otherwise it changes in steps of Step Hz
+#   (same as Tom's range(START_FREQ, STOP_FREQ, STEP_FREQ) loops, Stop is not played).
+SWEEP_START_KEY = "-SWEEP START FREQ-"
+SWEEP_START_DEF = "10"
+SWEEP_STOP_KEY = "-SWEEP STOP FREQ-"
+SWEEP_STOP_DEF = "200"
+SWEEP_STEP_KEY = "-SWEEP STEP FREQ-"
+SWEEP_STEP_DEF = "0"
+AMP_SW_KEY = "-SWEEP AMPLITUDE-"
+AMP_SW_DEF = "50"
+DUR_SW_KEY = "-SWEEP DURATION-"
+DUR_SW_DEF = "10"
+BURST_SW_KEY = "-SWEEP BURST PERIOD-"
+BURST_SW_DEF = "10"
+SWEEP_KEYS = [SWEEP_START_KEY, SWEEP_STOP_KEY, SWEEP_STEP_KEY, AMP_SW_KEY, DUR_SW_KEY, BURST_SW_KEY]
+SWEEP_DEFAULTS = [SWEEP_START_DEF, SWEEP_STOP_DEF, SWEEP_STEP_DEF, AMP_SW_DEF, DUR_SW_DEF, BURST_SW_DEF]
+
+# CHECKBOX KEY, logarithmic sweep (same time per octave) instead of linear (same time per Hz)
+SWEEP_LOG_KEY = "-SWEEP LOG-"
+
 # Button Text
 PLAY_AUDIO_BUTTON = "Play Audio Sample"
 # STOP_BUTTON = "Stop Audio"
@@ -157,7 +198,12 @@ PLAY_AUDIO_BUTTON = "Play Audio Sample"
 
 START_EXPERIMENT = "Start Experiment"
 STOP_EXPERIMENT = "Stop Experiment"
-BUTTON_EVENTS = [PLAY_AUDIO_BUTTON, START_EXPERIMENT, STOP_EXPERIMENT]
+
+# Key binding to stop the experiment (same as the "Stop Experiment" button).
+# Ignored while an input box has the focus, so typing a space (e.g. in the WAV file path) never stops it.
+STOP_KEY = "<space>"
+STOP_KEY_EVENT = "-STOP KEY-"
+BUTTON_EVENTS = [PLAY_AUDIO_BUTTON, START_EXPERIMENT, STOP_EXPERIMENT, STOP_KEY_EVENT]
 
 # Experiment Run Time
 HOURS_EXP_DEF = "0"
@@ -165,19 +211,84 @@ HOURS_EXP_KEY = "-HOURS EXP-"
 MIN_EXP_DEF = "1"
 MIN_EXP_KEY = "-MIN EXP-"
 
-# STOP IMAGE (for when there is silence in audio)
-# Windows version to access the pulse_wave image in the "img" folder
-# If os.path.join fails, uncomment this next line, but comment the other one to make the image loading work
-# STOP_IMG = "img/stop_image.png"
-
-# OS Independent way to get the "img" folder. Should work, but untested on Mac and Linux
-# Note: If you change the "img" folder name or location, this will crash the GUI.
-STOP_IMG = os.path.join(sourceFileDir, imgFolderDir, 'stop_image.png')
+# Audio Output (where the audio of "Play Audio Sample" and "Start Experiment" goes)
+# "None" and "WAV file" need no audio hardware, e.g. to test an experiment on a build machine.
+OUTPUT_KEY = "-AUDIO OUTPUT-"
+OUTPUT_SPEAKERS = "Speakers"
+OUTPUT_SPEAKERS_STREAMED = "Speakers (streamed)"
+OUTPUT_NULL = "None"
+OUTPUT_WAV = "WAV file"
+OUTPUT_DEF = OUTPUT_SPEAKERS
+# Audio backend of each output (see W.set_audio_backend())
+OUTPUT_BACKENDS = {OUTPUT_SPEAKERS: W.AUDIO_BACKEND_MIXER,
+                   OUTPUT_SPEAKERS_STREAMED: W.AUDIO_BACKEND_STREAM,
+                   OUTPUT_NULL: W.AUDIO_BACKEND_NULL,
+                   OUTPUT_WAV: W.AUDIO_BACKEND_WAV}
+WAV_PATH_KEY = "-WAV PATH-"
+WAV_PATH_DEF = W.WAV_FILE_DEFAULT
+# CHECKBOX KEY, "None" and "WAV file" outputs run as fast as possible instead of in real time
+FAST_OUTPUT_KEY = "-FAST OUTPUT-"
+
+# Experiment progress text (updated by E.EXPERIMENT_PROGRESS_EVENT)
+EXP_STATUS_KEY = "-EXP STATUS-"
+
+# Experiment Progress dashboard (TEXT KEYs), updated by E.EXPERIMENT_PROGRESS_EVENT.
+# The experiment sends its progress at most every E.PROGRESS_INTERVAL_SEC (E.ProgressReporter).
+DASH_ELAPSED_KEY = "-DASH ELAPSED-"
+DASH_REMAINING_KEY = "-DASH REMAINING-"
+DASH_BURSTS_KEY = "-DASH BURSTS-"
+DASH_BURST_SEC_KEY = "-DASH BURST SEC-"
+DASH_NEXT_BURST_KEY = "-DASH NEXT BURST-"
+DASH_ON_TIME_KEY = "-DASH ON TIME-"
+# Label of every dashboard value, in display order
+DASHBOARD_LABELS = {DASH_ELAPSED_KEY: "Elapsed:",
+                    DASH_REMAINING_KEY: "Remaining:",
+                    DASH_BURSTS_KEY: "Bursts:",
+                    DASH_BURST_SEC_KEY: "Burst Period:",
+                    DASH_NEXT_BURST_KEY: "Next Burst:",
+                    DASH_ON_TIME_KEY: "On Time:"}
+
+# Preview (GRAPH KEYs), the wave (one burst) and the burst/silence envelope of the whole experiment.
+# Drawn with one line per pixel column (smallest to largest sample), so any duration draws in milliseconds.
+PREVIEW_WAVE_KEY = "-PREVIEW WAVE-"
+PREVIEW_ENVELOPE_KEY = "-PREVIEW ENVELOPE-"
+PREVIEW_WIDTH = 400
+PREVIEW_HEIGHT = 60
+
+
+# Input boxes that only allow digits, each one sends an event (its key) when it is changed
+DIGIT_INPUT_KEYS = SINE_KEYS + PULSE_KEYS + SWEEP_KEYS + [SEED_KEY]
+
+# Wave type radios, each one sends an event (its key) when it is selected
+WAVE_TYPE_EVENTS = [SINE, PULSE, SWEEP]
+
+# Events that change the preview: wave pre-rendered, or a change of the burst/silence envelope
+PREVIEW_EVENTS = [E.STIMULUS_RENDERED_EVENT, HOURS_EXP_KEY, MIN_EXP_KEY, RANDOM_BURST_KEY, RANDOM_DIST_KEY]
 
 
 # ==== Non-GUI Variables ====
 is_running_experiment = False
 
+# Last disabled state applied to each wave specification input (key: True/False), see check_radio().
+# Only inputs whose state changes are updated.
+input_disabled_states = {}
+
+# Runs the experiment in the background (E.ExperimentProcess or E.ExperimentWorker), None if not started yet
+experiment_worker = None
+
+# Generated waves are cached, so pressing "Play Audio Sample" or "Start Experiment" again
+#   with the same specifications does not generate the wave again.
+# Max memory used by the cache is W.STIMULUS_CACHE_MAX_BYTES, keep this small for the lab PCs.
+stimulus_cache = W.StimulusCache(max_bytes=W.STIMULUS_CACHE_MAX_BYTES)
+
+# Renders the wave in the background after the specifications are edited (short pause in typing),
+#   so it is already in stimulus_cache when "Play Audio Sample" or "Start Experiment" is pressed.
+stimulus_renderer = E.StimulusRenderer(stimulus_cache)
+
+# True runs the experiment in a separate process (E.ExperimentProcess), the GUI can never delay a burst.
+# False runs it in a thread of the GUI's process (E.ExperimentWorker), easier for troubleshooting.
+RUN_EXPERIMENT_IN_PROCESS = True
+
 
 # ---- [START] FUNCTIONS FOR INTEGER CHECK IN INPUT BOXES -----
 # TODO: Put in a module
@@ -212,6 +323,11 @@ def get_default_from_key(key_str):
         if key_str == key:
             result = val
 
+    # Go through Sweep keys and defaults
+    for key, val in zip(SWEEP_KEYS, SWEEP_DEFAULTS):
+        if key_str == key:
+            result = val
+
     # Return the resulting value from associated key_str
     return result
 
@@ -252,6 +368,7 @@ def check_for_digits_in_key(key_str, values, window):
 
 
 def check_input_keys_for_non_digits(values, window):
+    # Checks every input box, main() only checks the input box that was changed (check_for_digits_in_key())
     # Check Sine Wave Specifications for non-digits and removing them
     for key_str in SINE_KEYS:
         check_for_digits_in_key(key_str, values, window)
@@ -260,33 +377,31 @@ def check_input_keys_for_non_digits(values, window):
     for key_str in PULSE_KEYS:
         check_for_digits_in_key(key_str, values, window)
 
+    # Check Sweep Specifications for non-digits and removing them
+    for key_str in SWEEP_KEYS:
+        check_for_digits_in_key(key_str, values, window)
+
 
 # ---- [END] FUNCTIONS FOR INTEGER CHECK IN INPUT BOXES -----
 
 
-# ---- [START] FUNCTIONS FOR Sine/Pulse input disabling -----
+# ---- [START] FUNCTIONS FOR Sine/Pulse/Sweep input disabling -----
 def check_radio(window, values):
-    if values[SINE] == True:
+    # Enable the inputs of the selected wave type, disable the inputs of the other wave types.
+    # Called when a wave type radio is selected, only updates the inputs that change (input_disabled_states).
+    wave_type_keys = {SINE: SINE_KEYS,
+                      PULSE: PULSE_KEYS,
+                      SWEEP: SWEEP_KEYS + [SWEEP_LOG_KEY]}
 
-        # Enable Sine inputs
-        for key in SINE_KEYS:
-            window[key].update(disabled=False)
+    for wave_type, keys in wave_type_keys.items():
+        is_disabled = not values[wave_type]
+        for key in keys:
+            if input_disabled_states.get(key) != is_disabled:
+                window[key].update(disabled=is_disabled)
+                input_disabled_states[key] = is_disabled
 
-        # Disable Pulse inputs
-        for key in PULSE_KEYS:
-            window[key].update(disabled=True)
 
-    else:
-        # Disable Sine inputs
-        for key in SINE_KEYS:
-            window[key].update(disabled=True)
-
-        # Enable Pulse inputs
-        for key in PULSE_KEYS:
-            window[key].update(disabled=False)
-
-
-# ---- [END] FUNCTIONS FOR Sine/Pulse input disabling -----
+# ---- [END] FUNCTIONS FOR Sine/Pulse/Sweep input disabling -----
 
 
 def get_layout():
@@ -294,13 +409,13 @@ def get_layout():
 
     # Sine, Column 1
     sine_col1_layout = [[sg.Push(), sg.Text("Frequency (10 to 200 Hz):"),
-                         sg.InputText(default_text=FREQ_DEF, size=(4, 1), key=FREQ_KEY)],
+                         sg.InputText(default_text=FREQ_DEF, size=(4, 1), key=FREQ_KEY, enable_events=True)],
                         [sg.Push(), sg.Text("Amplitude (1 to 100):"),
-                         sg.InputText(default_text=AMP_DEF, size=(4, 1), key=AMP_KEY)],
+                         sg.InputText(default_text=AMP_DEF, size=(4, 1), key=AMP_KEY, enable_events=True)],
                         [sg.Push(), sg.Text("Duration (seconds):"),
-                         sg.InputText(default_text=DUR_DEF, size=(4, 1), key=DUR_KEY)],
+                         sg.InputText(default_text=DUR_DEF, size=(4, 1), key=DUR_KEY, enable_events=True)],
                         [sg.Push(), sg.Text("Burst Period (seconds):"),
-                         sg.InputText(default_text=BURST_SINE_DEF, size=(4, 1), key=BURST_SINE_KEY)]
+                         sg.InputText(default_text=BURST_SINE_DEF, size=(4, 1), key=BURST_SINE_KEY, enable_events=True)]
                         ]
 
     # Sine, Column 2
@@ -328,15 +443,15 @@ def get_layout():
     #                      ]
 
     pulse_col1_layout = [[sg.Push(), sg.Text("Frequency (10 to 200 Hz):"),
-                          sg.InputText(default_text=PULSE_FREQ_DEF, disabled=False, size=(4, 1), key=PULSE_FREQ_KEY)],
+                          sg.InputText(default_text=PULSE_FREQ_DEF, disabled=False, size=(4, 1), key=PULSE_FREQ_KEY, enable_events=True)],
                          [sg.Push(), sg.Text("Amplitude (1 to 100):"),
-                          sg.InputText(default_text=AMP_P_DEF, size=(4, 1), key=AMP_P_KEY)],
+                          sg.InputText(default_text=AMP_P_DEF, size=(4, 1), key=AMP_P_KEY, enable_events=True)],
                          [sg.Push(), sg.Text("Duty Cycle (1% to 99%):"),
-                          sg.InputText(default_text=DUTY_CYCLE_DEF, size=(4, 1), key=DUTY_CYCLE_KEY)],
+                          sg.InputText(default_text=DUTY_CYCLE_DEF, size=(4, 1), key=DUTY_CYCLE_KEY, enable_events=True)],
                          [sg.Push(), sg.Text("Duration (seconds):"),
-                          sg.InputText(default_text=DUR_P_DEF, size=(4, 1), key=DUR_P_KEY)],
+                          sg.InputText(default_text=DUR_P_DEF, size=(4, 1), key=DUR_P_KEY, enable_events=True)],
                          [sg.Push(), sg.Text("Burst Period (seconds):"),
-                          sg.InputText(default_text=BURST_P_DEF, size=(4, 1), key=BURST_P_KEY)]
+                          sg.InputText(default_text=BURST_P_DEF, size=(4, 1), key=BURST_P_KEY, enable_events=True)]
                          ]
 
     # Pulse, Column 2
@@ -348,93 +463,167 @@ def get_layout():
     # Put 2 columns into a frame (gives that box shape)
     pulse_frame = sg.Frame("Pulse Specifications", layout=pulse_col_layout)
 
+    # Sweep, Column 1 (no image column, the frequency changes over time)
+    sweep_col1_layout = [[sg.Push(), sg.Text("Start Frequency (10 to 200 Hz):"),
+                          sg.InputText(default_text=SWEEP_START_DEF, size=(4, 1), key=SWEEP_START_KEY, enable_events=True)],
+                         [sg.Push(), sg.Text("Stop Frequency (10 to 200 Hz):"),
+                          sg.InputText(default_text=SWEEP_STOP_DEF, size=(4, 1), key=SWEEP_STOP_KEY, enable_events=True)],
+                         [sg.Push(), sg.Text("Step (Hz, 0 for smooth sweep):"),
+                          sg.InputText(default_text=SWEEP_STEP_DEF, size=(4, 1), key=SWEEP_STEP_KEY, enable_events=True)],
+                         [sg.Push(), sg.Checkbox("Logarithmic (smooth sweep only)", default=False,
+                                                 key=SWEEP_LOG_KEY)]
+                         ]
+
+    # Sweep, Column 2
+    sweep_col2_layout = [[sg.Push(), sg.Text("Amplitude (1 to 100):"),
+                          sg.InputText(default_text=AMP_SW_DEF, size=(4, 1), key=AMP_SW_KEY, enable_events=True)],
+                         [sg.Push(), sg.Text("Duration (seconds):"),
+                          sg.InputText(default_text=DUR_SW_DEF, size=(4, 1), key=DUR_SW_KEY, enable_events=True)],
+                         [sg.Push(), sg.Text("Burst Period (seconds):"),
+                          sg.InputText(default_text=BURST_SW_DEF, size=(4, 1), key=BURST_SW_KEY, enable_events=True)]
+                         ]
+
+    # Create Sweep Column Layout
+    sweep_col_layout = [[sg.Column(sweep_col1_layout), sg.Column(sweep_col2_layout, vertical_alignment="top")]]
+
+    # Put 2 columns into a frame (gives that box shape)
+    sweep_frame = sg.Frame("Sweep Specifications", layout=sweep_col_layout)
+
     # Experiment Layout
     exp_layout = [[sg.Text("How long do I run the experiment?")],
-                  [sg.Push(), sg.Text("Hours:"), sg.Input(default_text="0", size=(4, 1), key=HOURS_EXP_KEY)],
-                  [sg.Push(), sg.Text("Min:"), sg.Input(default_text="1", size=(4, 1), key=MIN_EXP_KEY)],
-                  [sg.Button(START_EXPERIMENT), sg.Button(STOP_EXPERIMENT, disabled=True)]
+                  [sg.Push(), sg.Text("Hours:"), sg.Input(default_text="0", size=(4, 1), key=HOURS_EXP_KEY, enable_events=True)],
+                  [sg.Push(), sg.Text("Min:"), sg.Input(default_text="1", size=(4, 1), key=MIN_EXP_KEY, enable_events=True)],
+                  [sg.Button(START_EXPERIMENT), sg.Button(STOP_EXPERIMENT, disabled=True)],
+                  [sg.Text("", size=(30, 1), key=EXP_STATUS_KEY)]
                   ]
 
+    # Audio Output Layout
+    output_layout = [[sg.Push(), sg.Text("Output:"),
+                      sg.Combo(list(OUTPUT_BACKENDS), default_value=OUTPUT_DEF, readonly=True, key=OUTPUT_KEY)],
+                     [sg.Push(), sg.Text("WAV File:"), sg.Input(default_text=WAV_PATH_DEF, size=(20, 1), key=WAV_PATH_KEY),
+                      sg.FileSaveAs(file_types=(("WAV Files", "*.wav"),), default_extension=".wav")],
+                     [sg.Checkbox("Run as fast as possible (None and WAV file only)", default=False,
+                                  key=FAST_OUTPUT_KEY)]
+                     ]
+
+    output_frame = sg.Frame("Audio Output", layout=output_layout)
+
     exp_frame = sg.Frame("Experiment Parameters", layout=exp_layout)
 
+    # Experiment Progress Layout (dashboard), one row per value
+    dashboard_layout = [[sg.Push(), sg.Text(label), sg.Text("-", size=(22, 1), key=key)]
+                        for key, label in DASHBOARD_LABELS.items()]
+    dashboard_frame = sg.Frame("Experiment Progress", layout=dashboard_layout)
+
+    # Preview, y-axis is the full amplitude range (-32000 to 32000), x-axis is one pixel per column
+    preview_layout = [[sg.Text("Wave:", size=(10, 1)),
+                       sg.Graph((PREVIEW_WIDTH, PREVIEW_HEIGHT), (0, -AMP_ACTUAL_MAX), (PREVIEW_WIDTH, AMP_ACTUAL_MAX),
+                                background_color="black", key=PREVIEW_WAVE_KEY)],
+                      [sg.Text("Experiment:", size=(10, 1)),
+                       sg.Graph((PREVIEW_WIDTH, PREVIEW_HEIGHT), (0, -AMP_ACTUAL_MAX), (PREVIEW_WIDTH, AMP_ACTUAL_MAX),
+                                background_color="black", key=PREVIEW_ENVELOPE_KEY)]
+                      ]
+    preview_frame = sg.Frame("Preview", layout=preview_layout)
+
     # Setup Layout
-    layout = [[sg.Text('Choose a Wave Type (Sine or Pulse):'),
-               sg.Radio(SINE, group_id=GROUP_ID, key=SINE, default=True),
-               sg.Radio(PULSE, group_id=GROUP_ID, key=PULSE),
-               sg.Checkbox("Random Burst", default=False, key=RANDOM_BURST_KEY)],
+    layout = [[sg.Text('Choose a Wave Type (Sine, Pulse or Sweep):'),
+               sg.Radio(SINE, group_id=GROUP_ID, key=SINE, default=True, enable_events=True),
+               sg.Radio(PULSE, group_id=GROUP_ID, key=PULSE, enable_events=True),
+               sg.Radio(SWEEP, group_id=GROUP_ID, key=SWEEP, enable_events=True),
+               sg.Checkbox("Random Burst", default=False, key=RANDOM_BURST_KEY, enable_events=True),
+               sg.Combo(E.BURST_DISTRIBUTIONS, default_value=RANDOM_DIST_DEF, readonly=True, key=RANDOM_DIST_KEY,
+                        enable_events=True),
+               sg.Text("Seed:"), sg.Input(default_text="", size=(10, 1), key=SEED_KEY, enable_events=True)],
               [sine_frame],
               [pulse_frame],
+              [sweep_frame],
+              [preview_frame],
               [sg.Button(PLAY_AUDIO_BUTTON)],
-              [exp_frame]
+              [exp_frame, output_frame, dashboard_frame]
               ]
 
     return layout
 
 
-def get_wave(values):
-    # Note: Will only work for sine/pulse. If you use different wave types, this code will need to be changed.
-    # Future feature: Store these into a class or dictionary?
-
-    wave_arr = ""
-
-    wave_snd = ""
-
-    # Get is_sine_wave
-    is_sine_wave = values[SINE]
-
-    # Get either sine or pulse specfications
-    if is_sine_wave:
-        print("Sine")
-
-        # For troubleshooting, are the input values accessible?
-        # for key in SINE_KEYS:
-        #     print(key, ":", values[key])
+def get_experiment_config(values):
+    # Puts the relevant values into a dictionary (experiment config, see module_experiment),
+    #   built once when an experiment starts. Unlike values (or GUI elements), it can be pickled.
+    # Note: Will only work for sine/pulse/sweep. If you use different wave types, this code will need to be changed.
 
+    if values[SINE]:
+        wave_type = W.SINE_WAVE
         amp_user = int(values[AMP_KEY])
         freq = int(values[FREQ_KEY])
+        duty_cycle = None
         dur = float(values[DUR_KEY])
-
-        # Convert user's AMP selection of 1-100 (user) to 1-32000 (actual)
-        amp = W.map_function(amp_user, from_low=AMP_USER_MIN, from_high=AMP_USER_MAX,
-                             to_low=AMP_ACTUAL_MIN, to_high=AMP_ACTUAL_MAX)
-
-        # sine_arr, sine_snd = W.get_sine_wave(dur=1.0)
-        sine_arr, sine_snd = W.get_sine_wave(amp, freq, dur)
-        # W.play_audio(sine_snd)
-        wave_arr = sine_arr
-        wave_snd = sine_snd
-
+        # A burst period of 0 would never end the experiment, see E.clamp_burst()
+        burst = E.clamp_burst(int(values[BURST_SINE_KEY]))
+    elif values[SWEEP]:
+        wave_type = E.SWEEP_WAVE
+        amp_user = int(values[AMP_SW_KEY])
+        freq = None
+        duty_cycle = None
+        dur = float(values[DUR_SW_KEY])
+        burst = E.clamp_burst(int(values[BURST_SW_KEY]))
     else:
-        print("Pulse")
-
-        # For troubleshooting, are the input values accessible?
-        for key in PULSE_KEYS:
-            print(key, ":", values[key])
+        wave_type = W.PULSE_WAVE
+        amp_user = int(values[AMP_P_KEY])
+        freq = int(values[PULSE_FREQ_KEY])
+        # Convert from int between 1 and 99 to float between 0.01 to 0.99
+        duty_cycle = int(values[DUTY_CYCLE_KEY]) / 100
+        dur = int(values[DUR_P_KEY])
+        burst = E.clamp_burst(int(values[BURST_P_KEY]))
 
-        # width_p = int(values[WIDTH_KEY])
-        # period_p = int(values[PERIOD_KEY])
+    # Convert user's AMP selection of 1-100 (user) to 1-32000 (actual)
+    amp = W.map_function(amp_user, from_low=AMP_USER_MIN, from_high=AMP_USER_MAX,
+                         to_low=AMP_ACTUAL_MIN, to_high=AMP_ACTUAL_MAX)
 
-        freq_p = int(values[PULSE_FREQ_KEY])
-        amp_p_user = int(values[AMP_P_KEY])
+    # Where the audio goes (Audio Output frame), real time or as fast as possible (None and WAV file only)
+    output = {"backend": OUTPUT_BACKENDS[values[OUTPUT_KEY]]}
+    if output["backend"] in (W.AUDIO_BACKEND_NULL, W.AUDIO_BACKEND_WAV):
+        output["speed"] = None if values[FAST_OUTPUT_KEY] else 1.0
+    if output["backend"] == W.AUDIO_BACKEND_WAV:
+        output["path"] = values[WAV_PATH_KEY]
 
-        # Convert from int between 1 and 99 to float between 0.01 to 0.99
-        duty_cycle_p = int(values[DUTY_CYCLE_KEY]) / 100
-        # count_p = int(values[COUNT_KEY])
-        dur_p = int(values[DUR_P_KEY])
-        burst_p = int(values[BURST_P_KEY])
+    hours_run_time = int(values[HOURS_EXP_KEY])
+    min_run_time = int(values[MIN_EXP_KEY])
 
-        # Convert user's AMP selection of 1-100 (user) to 1-32000 (actual)
-        amp_p = W.map_function(amp_p_user, from_low=AMP_USER_MIN, from_high=AMP_USER_MAX,
-                               to_low=AMP_ACTUAL_MIN, to_high=AMP_ACTUAL_MAX)
+    return {"wave_type": wave_type,
+            "amp": amp,
+            "freq": freq,
+            "duty_cycle": duty_cycle,
+            "dur": dur,
+            # The digit only boxes accept 0, the sweep is kept within the shaker's range (10 to 200 Hz)
+            "start_freq": E.clamp_sweep_freq(int(values[SWEEP_START_KEY])),
+            "stop_freq": E.clamp_sweep_freq(int(values[SWEEP_STOP_KEY])),
+            "step_freq": int(values[SWEEP_STEP_KEY]),
+            "sweep_type": W.SWEEP_LOG if values[SWEEP_LOG_KEY] else W.SWEEP_LINEAR,
+            "burst": burst,
+            "random_burst": values[RANDOM_BURST_KEY],
+            "burst_distribution": values[RANDOM_DIST_KEY],
+            # Empty seed: new seed, saved with the burst schedule when the experiment starts
+            "seed": int(values[SEED_KEY]) if values[SEED_KEY] else None,
+            "schedule_path": None,
+            "run_time": (hours_run_time * 60 * 60) + (min_run_time * 60),
+            "output": output,
+            "sample_rate": W.SAMPLE_RATE_DEFAULT}
 
-        # Get Pulse Wave array and sound array
-        # square_arr, square_snd = W.get_pulse_wave(amp=amp_p, period=period_p, pulse_width=width_p, pulse_count=count_p, dur=dur_p)
-        pulse_arr, pulse_snd = W.get_pulse_wave2(amp=amp_p, freq=freq_p, duty_cycle=duty_cycle_p, dur=dur_p)
-        wave_arr = pulse_arr
-        wave_snd = pulse_snd
 
-    # return wave_arr and wave_snd
-    return wave_arr, wave_snd
+def get_wave(values):
+    # wave_arr is for plotting, wave_snd is for playing sound (sine/pulse only, sweeps are streamed)
+    # Generated waves are cached (stimulus_cache), usually pre-rendered already (stimulus_renderer).
+    return stimulus_renderer.get_wave(get_experiment_config(values))
+
+
+def prerender_wave(values):
+    # Called after every edit of the wave specifications, renders the wave in the background (debounced).
+    # Incomplete specifications (e.g. an empty input box) cancel the render instead.
+    try:
+        config = get_experiment_config(values)
+    except ValueError:
+        stimulus_renderer.cancel()
+        return
+    stimulus_renderer.request(config)
 
 
 def get_burst(values):
@@ -447,10 +636,13 @@ def get_burst(values):
     # If sine, get sine burst, convert from seconds to milliseconds
     if is_sine_wave:
         # For Sine
-        burst = int(values[BURST_SINE_KEY]) * 1000
+        burst = E.clamp_burst(int(values[BURST_SINE_KEY])) * 1000
+    elif values[SWEEP]:
+        # For Sweep
+        burst = E.clamp_burst(int(values[BURST_SW_KEY])) * 1000
     else:
         # For Pulse
-        burst = int(values[BURST_P_KEY]) * 1000
+        burst = E.clamp_burst(int(values[BURST_P_KEY])) * 1000
 
     return burst
 
@@ -462,197 +654,43 @@ def get_burst2(values):
     # Initialize burst
     burst = 0
 
-    # If sine, get sine burst, else get pulse burst (in seconds)
+    # If sine, get sine burst, else get sweep or pulse burst (in seconds)
     if is_sine_wave:
         # For Sine
-        burst = int(values[BURST_SINE_KEY])
+        burst = E.clamp_burst(int(values[BURST_SINE_KEY]))
+    elif values[SWEEP]:
+        # For Sweep
+        burst = E.clamp_burst(int(values[BURST_SW_KEY]))
     else:
         # For Pulse
-        burst = int(values[BURST_P_KEY])
+        burst = E.clamp_burst(int(values[BURST_P_KEY]))
 
     return burst
 
 
-def wait_seconds(time_to_wait):
-    # Will use while loop to "wait" in time_to_wait seconds,
-    #   allows user to press spacebar on keyboard to stop experiment
-    # print("wait_seconds")
-
-    global is_running_experiment
-
-    if time_to_wait <= 0:
-        return
-    print("======================================")
-    print("Press Spacebar to Stop Experiment!")
-    print("Will wait", time_to_wait, "seconds")
-    print("======================================")
-
-    start_time = time.monotonic()
-
-    elapsed_time = 0
-
-    # Load a dummy image (actual version should say "Press any key or spacebar to stop the silence")
-    img = cv2.imread(STOP_IMG)
-
-    while elapsed_time < time_to_wait:
-
-        # time.sleep(1)
-
-        current_time = time.monotonic()
-        elapsed_time = current_time - start_time
-
-        # For troubleshooting, check if the loop is actually waiting.
-        # print(f"Waited {elapsed_time:.1f} seconds")
-
-        # OpenCV hack to capture keyboard input using an image.
-        # Could use another library, but I wanted to use something that would be familiar.
-        cv2.imshow("img", img)
-
-        key = cv2.waitKey(1000)
-
-        if key == 32:
-            print("You pressed spacebar, stopping experiment!")
-            is_running_experiment = False
-            break
-
-        # Alternative to above, press any key on the keyboard to break the loop
-        # if key >= 0:
-        #     print("You pressed any key, breaking loop")
-        #     is_running_experiment = False
-        #     break
-
-    print(f"Silence elapsed_time: {elapsed_time:.1f} seconds")
-    cv2.destroyAllWindows()
-    print("End of Loop")
-    pass
-
-
-def start_experiment(window, event, values):
-    # Runs the experiment for x hours and y minutes (in a thread)
-
-    global is_running_experiment
-
-    print("===================================================")
-    print("Experiment will only STOP after audio is played!")
-    print("Note: GUI will look like it is frozen!")
-    print("===================================================")
-
-    # Get if Random Burst is selected or not
-    is_random_burst_selected = values[RANDOM_BURST_KEY]
-
+def start_experiment(window, values):
+    # Starts the experiment in the background (process or thread, see RUN_EXPERIMENT_IN_PROCESS),
+    # returns the runner (call its stop() to stop the experiment).
+    # The runner reports back with window.write_event_value() (handled in main()), it never touches the window.
+    config = get_experiment_config(values)
 
-    start_time = time.monotonic()
-    elapsed_time = 0
+    if not RUN_EXPERIMENT_IN_PROCESS:
+        runner = E.ExperimentWorker(lambda worker: E.run_experiment(config, worker.stop_event, worker.report),
+                                    report=window.write_event_value)
+        runner.start()
+        return runner
 
-    hours_run_time = int(values[HOURS_EXP_KEY])
-    min_run_time = int(values[MIN_EXP_KEY])
-    expected_run_time = (hours_run_time * 60 * 60) + (min_run_time * 60)
-    print("expected_run_time:", expected_run_time, "seconds")
-
-    wave_arr, wave_snd = get_wave(values)
-    # W.play_audio(wave_snd)
-
-    # while True:
-    #     W.play_audio(wave_snd)
-    #     current_time = time.monotonic()
-
-    while elapsed_time < expected_run_time:
-        # for i in range(5):
-        # Convert burst, from seconds to milliseconds
-        # Get burst value depending on sine/pulse selection
-        # W.play_audio(wave_snd, burst=get_burst(values))
-
-        # Get playback_time
-        # If not doing random burst, will be the actual duration of the audio.
-        #   Then enter wait_seconds() for silence loop
-        # If doing random burst, playback_time will not exceed actual duration length.
-        #   Will need to compare burst value with duration, and use smaller value
-        #   IF burst is bigger than actual duration, this value will be silence
-
-        # Random Burst Wave Playback
-
-        # Compare Burst with Duration,
-        #   choose smaller for wave playback.
-        # If duration smaller than burst, calculate time_to_wait like normal
-        # If duration bigger than burst, time_to_wait is zero.
-
-
-        # Not Random Burst Wave Playback
-        # Calculate actual duration of wave audio (number of samples divided by sample rate)
-        # Note: You could get it from the GUI, but you would have to check if Sine/Pulse is selected
-        #        Then pull the values out, but I wanted the faster coding option.
-        #        Suggested idea: use a new function to extract based on Sine/Pulse selection
-
-        # Get dimensions of numpy array
-        num_rows, num_col = wave_snd.shape
-
-        # Get duration in seconds
-        wave_duration_sec = int(num_rows / W.SAMPLE_RATE_DEFAULT)
-
-        # Get silence time from burst.
-        # Math stuff: Burst = Wave_Duration + Time_to_Wait
-        #   So solve for Time_to_Wait, Time_to_Wait = Burst - Wave_Duration
-
-        # Convert to seconds
-        burst_sec = get_burst2(values)
-
-        # If random burst selected, change burst_sec to a random int between 1 and burst_max (should always be one)
-        if is_random_burst_selected == True:
-            # For troubleshooting:
-            # print("is_random_burst_selected:", is_random_burst_selected)
-            # Set burst_max as burst_sec
-            burst_max = burst_sec
-            print("Random Burst is Selected! Choosing random value between 1 and", burst_max)
-            # Choose random int from 1 to burst_sect
-            burst_sec = random.randint(1, burst_max)
-            print("Random burst_sec:", burst_sec)
-
-        # Compare Burst with Duration,
-        #   choose smaller for wave playback.
-        # If duration smaller than burst, calculate time_to_wait like normal
-        # If duration bigger than burst, time_to_wait is zero.
-        if burst_sec < wave_duration_sec:
-            wave_duration_ms = int(1000 * burst_sec)
-        else:
-            wave_duration_ms = int(1000 * wave_duration_sec)
-
-        # Calculate time_to_wait
-        time_to_wait = burst_sec - wave_duration_sec
-
-        # Convert to milliseconds since W.play_audio2() needs it in milliseconds
-        print("Will play audio for:", wave_duration_ms / 1000, "seconds")
-
-        # Play Audio and Wait Section
-        # Play the audio to the desired duration
-        W.play_audio2(wave_snd, playback_time=wave_duration_ms)
-
-        # Actively wait the desired time (can press spacebar to end entire experiment)
-        # Note: if time_to_wait is negative because of random burst,
-        # function will run so fast that almost no time will go by.
-        wait_seconds(time_to_wait)
-
-        if not is_running_experiment:
-            print(event, "was pressed")
-            print("Stopping experiment after playing current audio sample")
-            break
-
-        current_time = time.monotonic()
-        elapsed_time = current_time - start_time
-        print("Experiment elapsed_time:", elapsed_time, "second(s)")
+    # The wave is generated here (stimulus_cache), and handed to the process through shared memory
+    wave_snd = None
+    if not E.is_wave_streamed(config):
+        wave_arr, wave_snd = stimulus_renderer.get_wave(config)
 
-    print(f"Experiment has run for {elapsed_time:.2f} seconds")
-    # Convert seconds to hours
-    hours_elapsed = elapsed_time / 60 / 60
+    # The audio device is used by the experiment process now (started again on the next "Play Audio Sample")
+    W.audio_engine.stop()
 
-    # Get the decimal hours (everything after the decimal, e.g. 5.2 hours so extract the 0.2)
-    #   This is the % 1, or mod 1 portion.
-    # Then convert to minutes by multiplying by 60
-    min_elapsed = (hours_elapsed % 1) * 60
-    print(f"or {hours_elapsed:.1f} hour(s) and {min_elapsed:.1f} minute(s)")
-
-    set_stop_experiment_variables_and_buttons(window)
-
-    pass
+    runner = E.ExperimentProcess(config, wave_snd, report=window.write_event_value)
+    runner.start()
+    return runner
 
 
 def set_start_experiment_variables_and_buttons(window):
@@ -667,6 +705,7 @@ def set_start_experiment_variables_and_buttons(window):
     window[START_EXPERIMENT].update(disabled=True)
     window[STOP_EXPERIMENT].update(disabled=False)
     window[PLAY_AUDIO_BUTTON].update(disabled=True)
+    clear_experiment_status(window)
     pass
 
 
@@ -684,23 +723,121 @@ def set_stop_experiment_variables_and_buttons(window):
     pass
 
 
+def draw_min_max_columns(graph, mins, maxs, color, label=None):
+    # Draws a decimated wave (one column per pixel, see W.get_min_max_columns()) on a preview graph.
+    # One polyline going down and up every column, a single canvas item no matter the duration.
+    graph.erase()
+    graph.draw_line((0, 0), (PREVIEW_WIDTH, 0), color="gray")
+    points = []
+    for x, (low, high) in enumerate(zip(mins.tolist(), maxs.tolist())):
+        points.append((x, low))
+        points.append((x, high))
+    if len(points) > 1:
+        graph.draw_lines(points, color=color)
+    if label is not None:
+        graph.draw_text(label, (PREVIEW_WIDTH - 4, AMP_ACTUAL_MAX), color="white", text_location=sg.TEXT_LOCATION_TOP_RIGHT)
+
+
+def update_preview(window, values):
+    # Draws the wave of one burst and the envelope of the whole experiment.
+    # The wave is drawn from stimulus_cache if it is pre-rendered (see E.STIMULUS_RENDERED_EVENT),
+    #   otherwise (streamed, too big for the cache, or not rendered yet) from E.get_wave_columns(),
+    #   which only generates one period (or one short burst), so any duration is drawn in milliseconds.
+    try:
+        config = get_experiment_config(values)
+    except ValueError:
+        return
+
+    cache_key = None if E.is_wave_streamed(config) else E.get_wave_key(config)
+    if cache_key is not None and cache_key in stimulus_cache:
+        wave_arr, wave_snd = stimulus_cache.get(cache_key)
+        # Only the part played every burst
+        num_samples = W.get_num_samples(min(config["burst"], config["dur"]), config["sample_rate"])
+        mins, maxs = W.get_min_max_columns(wave_arr[:num_samples], PREVIEW_WIDTH)
+    else:
+        mins, maxs, num_samples = E.get_wave_columns(config, PREVIEW_WIDTH)
+    label = f"{num_samples / config['sample_rate']:g} sec"
+    draw_min_max_columns(window[PREVIEW_WAVE_KEY], mins, maxs, "lime", label)
+
+    # Random bursts with a seed are drawn from their schedule (same as the experiment will play),
+    #   without a seed with the longest burst period
+    burst_periods_ms = None
+    if config["random_burst"] and config["seed"] is not None:
+        seed, burst_periods_ms = E.get_burst_schedule(config)
+    mins, maxs = E.get_envelope_columns(config, PREVIEW_WIDTH, burst_periods_ms)
+    label = f"{config['run_time']:g} sec" + (", random bursts" if config["random_burst"] else "")
+    draw_min_max_columns(window[PREVIEW_ENVELOPE_KEY], mins, maxs, "yellow", label)
+
+
+def format_seconds(seconds):
+    # Seconds as hours:minutes:seconds, e.g. 3725 is "1:02:05"
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def clear_experiment_status(window):
+    # Empties the dashboard, used when an experiment starts
+    window[EXP_STATUS_KEY].update("Running")
+    for key in DASHBOARD_LABELS:
+        window[key].update("-")
+
+
+def update_experiment_status(window, progress):
+    # Shows the progress reported by the experiment (E.EXPERIMENT_PROGRESS_EVENT, see E.ProgressReporter)
+    # on the dashboard. Only arrives every E.PROGRESS_INTERVAL_SEC, so updating every text is cheap.
+    elapsed_time = progress["elapsed_time"]
+    window[EXP_STATUS_KEY].update(f"Burst {progress['num_bursts']}, "
+                                  f"{elapsed_time:.0f} of {progress['expected_run_time']} seconds")
+    window[DASH_ELAPSED_KEY].update(format_seconds(elapsed_time))
+    window[DASH_REMAINING_KEY].update(format_seconds(progress["remaining_time"]))
+    window[DASH_BURSTS_KEY].update(str(progress["num_bursts"]))
+
+    # Burst period of the last burst (the random value if Random Burst is selected)
+    if progress["burst_sec"] is not None:
+        window[DASH_BURST_SEC_KEY].update(f"{progress['burst_sec']:g} sec")
+
+    # No burst starts after the end of the experiment
+    next_burst_time = progress["next_burst_time"]
+    if next_burst_time < progress["expected_run_time"]:
+        time_to_next = max(next_burst_time - elapsed_time, 0)
+        window[DASH_NEXT_BURST_KEY].update(f"{format_seconds(next_burst_time)} (in {time_to_next:.0f} sec)")
+    else:
+        window[DASH_NEXT_BURST_KEY].update("None (last burst)")
+
+    on_time_text = f"{progress['on_time_percent']:.1f}%"
+    if progress["lateness"] is not None:
+        on_time_text += f" (last {progress['lateness'] * 1000:.1f} msec late)"
+    window[DASH_ON_TIME_KEY].update(on_time_text)
+
+
 def event_manager(window, event, values):
-    global is_running_experiment
+    global is_running_experiment, experiment_worker
     # Get Sine/Pulse Radio selection.
     # If Sine is selected, values[SINE] will be true.
     is_sine_wave = values[SINE]
 
-    p = Process()
-
     print(RANDOM_BURST_KEY, ":", values[RANDOM_BURST_KEY])
 
     if event == PLAY_AUDIO_BUTTON:
         print("You pressed", event)
         # Where Tom's Code will be accessed.
 
-        # wave_arr is for plotting, wave_snd is for playing sound
-        wave_arr, wave_snd = get_wave(values)
-        W.play_audio(wave_snd, get_burst(values))
+        config = get_experiment_config(values)
+        E.set_audio_output(config["output"])
+
+        try:
+            # wave_arr is for plotting, wave_snd is for playing sound
+            if E.is_wave_streamed(config):
+                W.play_audio(E.get_wave_stream(config), get_burst(values))
+            else:
+                wave_arr, wave_snd = stimulus_renderer.get_wave(config)
+                W.play_audio(wave_snd, get_burst(values))
+        except W.pygame.error as error:
+            # No audio device (e.g. speakers selected on a PC without a sound card), the GUI keeps running
+            print("Could not play audio, select the None or WAV file output:", error)
+        finally:
+            # Goes back to the speakers (pygame.mixer), which also closes the WAV file
+            W.set_audio_backend(W.AUDIO_BACKEND_MIXER)
 
     elif event == START_EXPERIMENT:
         set_start_experiment_variables_and_buttons(window)
@@ -717,23 +854,26 @@ def event_manager(window, event, values):
         print(f"Will run experiment for {values[HOURS_EXP_KEY]} hour(s) and {values[MIN_EXP_KEY]} minute(s)")
 
         # Non-Thread, Non-Process Version
-        start_experiment(window, event, values)
+        # start_experiment(window, event, values)
 
         # Thread Version
         # experiment_thread = threading.Thread(target=start_experiment, args=(window, event, values), daemon=True)
         # experiment_thread.start()
         # time.sleep(5)
 
-        # Process Version (Should allow user to actually Stop Experiment whenever they want)
-        # Current bug: GUI elements cannot be pickled.
-        #   Two possible solutions: (1) put relevant values into a dictionary or (2) use pathos multiprocessing
+        # Process Version (GUI stays responsive, so Stop Experiment works right away)
+        # GUI elements cannot be pickled, so the relevant values are put into a dictionary (get_experiment_config())
         # p = Process(target=start_experiment, args=(window, event, values,))
         # p.start()
+        experiment_worker = start_experiment(window, values)
 
-    elif event == STOP_EXPERIMENT:
+    elif event in (STOP_EXPERIMENT, STOP_KEY_EVENT):
         # set_stop_experiment_variables_and_buttons(window)
-        is_running_experiment = False
-        print("You pressed", event)
+        # Ends the experiment's current wait right away, buttons are reset at E.EXPERIMENT_DONE_EVENT
+        if is_running_experiment:
+            is_running_experiment = False
+            experiment_worker.stop()
+            print("You pressed", event)
 
         # Process Version
         # p.terminate()
@@ -757,6 +897,12 @@ def event_manager(window, event, values):
     pass
 
 
+def is_input_focused(window):
+    # True while an input box (or drop down) has the keyboard focus, the spacebar types there instead of stopping
+    element = window.find_element_with_focus()
+    return isinstance(element, (sg.Input, sg.Combo, sg.Multiline))
+
+
 def main():
     print("main")
 
@@ -764,32 +910,67 @@ def main():
     sg.theme('DarkGrey')
 
     # Create Window, call get_layout() to get layout.
-    window = sg.Window('FlyShaker GUI', get_layout())
+    window = sg.Window('FlyShaker GUI', get_layout(), finalize=True)
+
+    # Spacebar stops the experiment (same as Stop Experiment), unless typing in an input box (see is_input_focused())
+    window.bind(STOP_KEY, STOP_KEY_EVENT)
+
+    # pygame.mixer is initialized on the first playback on the speakers (quit after the window closes),
+    #   so the GUI also starts on a PC without audio hardware (use the None or WAV file output there)
 
+    # Disable the input boxes of the wave types that are not selected (Sine is selected at the start)
+    # Pre-rendered waves are drawn in the preview (E.STIMULUS_RENDERED_EVENT, write_event_value is thread safe)
+    stimulus_renderer.report_function = window.write_event_value
+
+    event, values = window.read(timeout=0)
+    check_radio(window, values)
+    prerender_wave(values)
+    update_preview(window, values)
 
     # Initialize empty experiment_thread object, will be used with "Start Experiment" is pushed
     # experiment_thread = threading.Thread()
 
-    # Event Loop to process "events" and get the "values" of the inputs
+    # Event Loop to process "events" and get the "values" of the inputs.
+    # window.read() waits for the next event (no timeout), so the GUI uses almost no CPU while idle:
+    # input boxes and radios send events when changed, the experiment sends its events with write_event_value().
 
     # While Loop
     while True:
-        event, values = window.read(timeout=10)
-
-        # Make sure input boxes only have digits
-        check_input_keys_for_non_digits(values, window)
-
-        # Checks if Sine or Pulse is selected, then disables the non-selected input boxes.
-        # For example, if Sine is selected, then Pulse Specification's input boxes are disabled (no input allowed).
-        check_radio(window, values)
+        event, values = window.read()
 
         if event == sg.WIN_CLOSED:
             break
+        elif event in DIGIT_INPUT_KEYS:
+            # Make sure the changed input box only has digits
+            check_for_digits_in_key(event, values, window)
+            prerender_wave(values)
+            update_preview(window, values)
+        elif event in WAVE_TYPE_EVENTS:
+            # Sine, Pulse or Sweep was selected, disable the input boxes of the other wave types.
+            # For example, if Sine is selected, then Pulse Specification's input boxes are disabled (no input allowed).
+            check_radio(window, values)
+            prerender_wave(values)
+            update_preview(window, values)
+        elif event in PREVIEW_EVENTS:
+            # Wave pre-rendered, or experiment settings changed (burst/silence envelope)
+            update_preview(window, values)
+        elif event == E.EXPERIMENT_PROGRESS_EVENT:
+            update_experiment_status(window, values[event])
+        elif event == E.EXPERIMENT_DONE_EVENT:
+            print("Experiment done")
+            set_stop_experiment_variables_and_buttons(window)
+            # Value is how long the experiment ran (seconds), None if it failed
+            if values[event] is not None:
+                window[EXP_STATUS_KEY].update(f"Done, ran for {format_seconds(values[event])}")
+        elif event == STOP_KEY_EVENT and is_input_focused(window):
+            # A space typed into an input box (e.g. the WAV file path), not a stop
+            pass
         elif event in BUTTON_EVENTS:
             event_manager(window, event, values)
 
     # Close Window after breaking out of loop
     window.close()
+    W.audio_engine.stop()
 
 
 if __name__ == "__main__":
@@ -582,8 +582,8 @@ def start_experiment(window, event, values):
         #        Then pull the values out, but I wanted the faster coding option.
         #        Suggested idea: use a new function to extract based on Sine/Pulse selection
 
-        # Get dimensions of numpy array
-        num_rows, num_col = wave_snd.shape
+        # Get number of samples (rows), sound arrays can be 1-D (mono) or have one column per channel
+        num_rows = len(wave_snd)
 
         # Get duration in seconds
         wave_duration_sec = int(num_rows / W.SAMPLE_RATE_DEFAULT)
@@ -0,0 +1,1068 @@
+"""
+Experiment Module
+
+@author Johnny Duong
+
+Description:
+Experiment logic for the FlyShakerGUI that does not need the GUI:
+the experiment config (a dictionary, see get_experiment_config() in FlyShakerGUI.py),
+the experiment loop (run_experiment()), scheduling of the bursts (BurstScheduler),
+and running an experiment in a background thread (ExperimentWorker) or in a separate process (ExperimentProcess).
+
+An experiment config only holds numbers, strings and booleans, so it can be pickled (sent to another process)
+or saved as JSON:
+    wave_type:      module_wave_gen.SINE_WAVE, module_wave_gen.PULSE_WAVE or SWEEP_WAVE
+    amp:            amplitude, 1 to 32000 (already mapped from the GUI's 1 to 100)
+    freq:           Hz (sine and pulse)
+    duty_cycle:     0.01 to 0.99 (pulse)
+    dur:            seconds, duration of the wave
+    start_freq, stop_freq, step_freq, sweep_type: sweep only (step_freq 0 is a smooth sweep)
+    burst:          seconds, burst period (burst + silence)
+    random_burst:   True gives every burst a random burst period (see get_burst_schedule())
+    burst_distribution: random burst periods, BURST_UNIFORM, BURST_EXPONENTIAL or BURST_POISSON
+    seed:           int, seed of the random burst periods, None for a new seed every run (saved with the schedule)
+    schedule_path:  JSON file the random burst schedule is saved to, None for the default (see get_schedule_path())
+    run_time:       seconds, how long the experiment runs
+    output:         dictionary, backend (module_wave_gen.AUDIO_BACKEND_*) and its options (path, speed)
+    sample_rate:    Hz
+
+Bursts are scheduled at absolute deadlines, taken from one clock reading at the start of the experiment,
+instead of sleeping relative pieces (play, then wait, then play...), so small delays never add up.
+"""
+
+import collections
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+import module_wave_gen as W
+
+# Wave type of sweeps in an experiment config (sine and pulse use module_wave_gen.SINE_WAVE and PULSE_WAVE)
+SWEEP_WAVE = "sweep"
+
+# Sine waves longer than this (in seconds) are streamed block by block during an experiment
+# instead of being generated as one large array (see module_wave_gen.stream_sine_wave()).
+STREAM_MIN_DUR_SEC = 60
+
+# Distributions of random burst periods (see get_burst_schedule()), all with millisecond resolution:
+# uniform: from RANDOM_BURST_MIN_SEC to burst seconds (like the old random.randint(1, burst), but not whole seconds)
+# exponential: RANDOM_BURST_MIN_SEC plus an exponential time, burst seconds on average
+# poisson: bursts start as a Poisson process (memoryless, every msec is as likely), burst seconds on average,
+#          no minimum (the next burst can cut the current one short)
+BURST_UNIFORM = "uniform"
+BURST_EXPONENTIAL = "exponential"
+BURST_POISSON = "poisson"
+BURST_DISTRIBUTIONS = [BURST_UNIFORM, BURST_EXPONENTIAL, BURST_POISSON]
+
+# Frequency range of the shaker (Hz). Sweep frequencies outside of it are clamped by the GUI (clamp_sweep_freq())
+# and rejected by load_config(), a log sweep cannot start at 0 Hz.
+SWEEP_FREQ_MIN = 10
+SWEEP_FREQ_MAX = 200
+
+# Shortest burst period (seconds). A burst period of 0 would never move the next deadline forward,
+# so it is clamped (clamp_burst()) by the GUI, load_config() and run_experiment().
+BURST_MIN_SEC = 1
+
+# Shortest random burst period (seconds) of the uniform and exponential distributions
+RANDOM_BURST_MIN_SEC = 1
+
+# Random burst schedules are saved to this file (time.strftime() format) if the config has no schedule_path
+SCHEDULE_FILE_FORMAT = "burst_schedule_%Y-%m-%d_%H-%M-%S.json"
+
+# Experiment config with the GUI's default values (Sine Specifications, 1 minute, speakers),
+# used for the keys a config file leaves out (see load_config())
+DEFAULT_CONFIG = {"wave_type": W.SINE_WAVE,
+                  "amp": 16000,
+                  "freq": 200,
+                  "duty_cycle": 0.5,
+                  "dur": 1.0,
+                  "start_freq": 10,
+                  "stop_freq": 200,
+                  "step_freq": 0,
+                  "sweep_type": W.SWEEP_LINEAR,
+                  "burst": 1,
+                  "random_burst": False,
+                  "burst_distribution": BURST_UNIFORM,
+                  "seed": None,
+                  "schedule_path": None,
+                  "run_time": 60,
+                  "output": {"backend": W.AUDIO_BACKEND_MIXER},
+                  "sample_rate": W.SAMPLE_RATE_DEFAULT}
+
+# A burst is on time if it starts at most this late (seconds), see BurstScheduler.get_report()
+ON_TIME_TOLERANCE_SEC = 0.005
+
+# Progress of a running experiment is reported at most this often (seconds), see ProgressReporter
+PROGRESS_INTERVAL_SEC = 0.5
+
+# StimulusRenderer waits for this long (seconds) without parameter edits before it renders the wave (debounce)
+PRERENDER_DELAY_SEC = 0.3
+
+# ExperimentProcess.stop() terminates the process if it has not ended this long (seconds) after the stop
+STOP_TIMEOUT_SEC = 1.0
+
+# Keys of the reports sent by ExperimentWorker (PySimpleGUI event keys when report is window.write_event_value)
+EXPERIMENT_PROGRESS_EVENT = "-EXPERIMENT PROGRESS-"
+EXPERIMENT_DONE_EVENT = "-EXPERIMENT DONE-"
+
+# Key of the report sent by StimulusRenderer when a wave is rendered into the cache (value: the cache key)
+STIMULUS_RENDERED_EVENT = "-STIMULUS RENDERED-"
+
+# Commands for ExperimentWorker.commands
+STOP_COMMAND = "stop"
+
+
+class BurstScheduler:
+    """
+    Schedules bursts at absolute deadlines. Burst k starts at start_time + the burst periods of the bursts before it,
+    start_time is read once from the clock (start()).
+    Sleeping, Python overhead and wave generation can make one burst late,
+    but they are never added to the next deadlines, so there is no cumulative drift, no matter how long the experiment.
+
+    Lateness (actual start minus deadline) is recorded for every burst, see get_report().
+
+    Example (burst_period in seconds, wait_until() queues or writes silence until the deadline):
+        scheduler = BurstScheduler()
+        scheduler.start()
+        while scheduler.get_next_elapsed() < run_time:
+            wait_until(scheduler.next_deadline)
+            scheduler.start_burst(burst_period)
+            play_burst()
+        scheduler.print_report()
+    """
+
+    def __init__(self, clock=time.monotonic, on_time_tolerance=ON_TIME_TOLERANCE_SEC):
+        # clock is a function returning seconds, e.g. time.monotonic or an audio engine's get_time
+        self.clock = clock
+        self.on_time_tolerance = on_time_tolerance
+        self.start_time = None
+        self.next_deadline = None
+        # Clock time the last burst starts (its deadline plus its lateness)
+        self.last_start_time = None
+        # Lateness of every burst (seconds), negative if early
+        self.lateness = []
+        # Number of bursts that were at most on_time_tolerance late
+        self.num_on_time = 0
+
+    def start(self):
+        # Start of the experiment, the first burst is due now
+        self.start_time = self.clock()
+        self.next_deadline = self.start_time
+        self.lateness = []
+        self.num_on_time = 0
+
+    def get_elapsed(self):
+        # Seconds since start()
+        return self.clock() - self.start_time
+
+    def get_next_elapsed(self):
+        # Seconds from start() to the next deadline
+        return self.next_deadline - self.start_time
+
+    def get_time_to_wait(self):
+        # Seconds until the next deadline (negative if it has passed)
+        return self.next_deadline - self.clock()
+
+    def start_burst(self, burst_period):
+        """
+        Call right when the next burst starts. Records its lateness and schedules the burst after it.
+
+        :param burst_period: a float, unit: seconds. Time from this burst's deadline to the next burst's deadline
+                             (burst + silence).
+        :return: a float, unit: seconds, lateness of this burst.
+        """
+        self.last_start_time = self.clock()
+        lateness = self.last_start_time - self.next_deadline
+        self.lateness.append(lateness)
+        if lateness <= self.on_time_tolerance:
+            self.num_on_time += 1
+        self.next_deadline += burst_period
+        return lateness
+
+    def get_on_time_percent(self):
+        # Percentage of the bursts so far that were on time (100 if there were no bursts yet)
+        if not self.lateness:
+            return 100.0
+        return 100 * self.num_on_time / len(self.lateness)
+
+    def get_report(self):
+        """
+        Lateness statistics of the bursts so far.
+
+        :return: dict with num_bursts, mean_lateness_ms, max_lateness_ms, last_lateness_ms and on_time_percent.
+                 last_lateness_ms is the drift at the end of the experiment (it does not grow with run time).
+                 on_time_percent is the percentage of bursts at most on_time_tolerance late.
+        """
+        if not self.lateness:
+            return {"num_bursts": 0, "mean_lateness_ms": 0.0, "max_lateness_ms": 0.0, "last_lateness_ms": 0.0,
+                    "on_time_percent": 100.0}
+
+        return {"num_bursts": len(self.lateness),
+                "mean_lateness_ms": 1000 * sum(self.lateness) / len(self.lateness),
+                "max_lateness_ms": 1000 * max(self.lateness),
+                "last_lateness_ms": 1000 * self.lateness[-1],
+                "on_time_percent": self.get_on_time_percent()}
+
+    def print_report(self):
+        report = self.get_report()
+        print(f"Bursts: {report['num_bursts']}, lateness mean {report['mean_lateness_ms']:.2f} msec, "
+              f"max {report['max_lateness_ms']:.2f} msec, last {report['last_lateness_ms']:.2f} msec, "
+              f"{report['on_time_percent']:.1f}% on time")
+
+
+class ProgressReporter:
+    """
+    Sends the progress of a running experiment (EXPERIMENT_PROGRESS_EVENT) from its own thread,
+    at most every interval seconds, so reporting never slows the audio path:
+    the experiment loop only stores its latest values (update(), no GUI or queue call),
+    values that changed between two reports are sent together in one report (only the latest ones).
+
+    Bursts are queued ahead of time (see module_wave_gen.BurstPlayer.get_time()), so a burst is only reported
+    once clock (the engine's real clock, e.g. time.monotonic for the speakers) reaches its start time,
+    and elapsed_time is read from clock, not from the end of what is queued.
+
+    Every report is a dictionary with:
+        elapsed_time, remaining_time, expected_run_time (seconds),
+        num_bursts, burst_sec (burst period of the last burst, the random value with Random Burst),
+        next_burst_time (elapsed time of the next burst's deadline), on_time_percent, lateness (last burst, seconds)
+
+    Example:
+        reporter = ProgressReporter(report, scheduler, expected_run_time, clock=engine.get_time)
+        reporter.start()
+        ... reporter.update(burst_sec, lateness) after every burst ...
+        reporter.stop()    # sends the final progress
+    """
+
+    def __init__(self, report, scheduler, expected_run_time, interval=PROGRESS_INTERVAL_SEC, clock=None):
+        self.report_function = report
+        self.scheduler = scheduler
+        # Real clock of the output, same time base as the scheduler's clock (which can be ahead of it)
+        self.clock = scheduler.clock if clock is None else clock
+        self.expected_run_time = expected_run_time
+        self.interval = interval
+        self.progress = {"num_bursts": 0, "burst_sec": None, "next_burst_time": scheduler.get_next_elapsed(),
+                         "on_time_percent": 100.0, "lateness": None}
+        # (start time, progress) of the bursts that are queued but have not started yet
+        self.pending = collections.deque()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def update(self, burst_sec, lateness):
+        # Called by the experiment loop after every burst, only stores the values (sent by the reporter thread).
+        # All values of a burst are stored together, so a report never mixes two bursts.
+        # They are reported once the burst has started (see send()).
+        progress = {"num_bursts": len(self.scheduler.lateness),
+                    "burst_sec": burst_sec,
+                    "next_burst_time": self.scheduler.get_next_elapsed(),
+                    "on_time_percent": self.scheduler.get_on_time_percent(),
+                    "lateness": lateness}
+        with self.lock:
+            self.pending.append((self.scheduler.last_start_time, progress))
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.send()
+
+    def send(self):
+        current_time = self.clock()
+        with self.lock:
+            # Latest burst that has started by now
+            while self.pending and self.pending[0][0] <= current_time:
+                self.progress = self.pending.popleft()[1]
+            progress = dict(self.progress)
+
+        elapsed_time = current_time - self.scheduler.start_time
+        progress.update({"elapsed_time": elapsed_time,
+                         "remaining_time": max(self.expected_run_time - elapsed_time, 0),
+                         "expected_run_time": self.expected_run_time})
+        self.report_function(EXPERIMENT_PROGRESS_EVENT, progress)
+
+    def stop(self):
+        # Stops the reporter thread and sends the final progress
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        self.send()
+
+
+def load_config(path):
+    """
+    Reads an experiment config from a JSON (.json) or TOML (.toml, Python 3.11 or newer) file.
+    Keys that are left out get the values of DEFAULT_CONFIG.
+
+    :param path: a str, path of the config file.
+    :return: experiment config (dictionary).
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".toml":
+        # Only imported for TOML files (part of the standard library since Python 3.11)
+        import tomllib
+        with open(path, "rb") as config_file:
+            file_config = tomllib.load(config_file)
+    else:
+        with open(path) as config_file:
+            file_config = json.load(config_file)
+
+    config = dict(DEFAULT_CONFIG)
+    config.update(file_config)
+    config["output"] = dict(DEFAULT_CONFIG["output"], **file_config.get("output", {}))
+
+    if config["wave_type"] not in (W.SINE_WAVE, W.PULSE_WAVE, SWEEP_WAVE):
+        raise ValueError(f"wave_type must be {W.SINE_WAVE}, {W.PULSE_WAVE} or {SWEEP_WAVE}, "
+                         f"not {config['wave_type']}")
+    if config["burst_distribution"] not in BURST_DISTRIBUTIONS:
+        raise ValueError(f"burst_distribution must be one of {BURST_DISTRIBUTIONS}, "
+                         f"not {config['burst_distribution']}")
+    for key in ("start_freq", "stop_freq"):
+        if not SWEEP_FREQ_MIN <= config[key] <= SWEEP_FREQ_MAX:
+            raise ValueError(f"{key} must be from {SWEEP_FREQ_MIN} to {SWEEP_FREQ_MAX} Hz, not {config[key]}")
+    backend = config["output"]["backend"]
+    if backend not in W.AUDIO_ENGINES:
+        raise ValueError(f"output backend must be one of {sorted(W.AUDIO_ENGINES)}, not {backend}")
+    # Only the null and WAV file outputs have a speed, only the WAV file output has a path
+    if "speed" in config["output"] and backend not in (W.AUDIO_BACKEND_NULL, W.AUDIO_BACKEND_WAV):
+        raise ValueError(f"output speed only works with the {W.AUDIO_BACKEND_NULL} and {W.AUDIO_BACKEND_WAV} outputs")
+    if "path" in config["output"] and backend != W.AUDIO_BACKEND_WAV:
+        raise ValueError(f"output path only works with the {W.AUDIO_BACKEND_WAV} output")
+    config["burst"] = clamp_burst(config["burst"])
+    return config
+
+
+def clamp_burst(burst):
+    """
+    Clamps a burst period to at least BURST_MIN_SEC seconds, same as the GUI's digits only Burst Period box allows 0.
+
+    :param burst: a number, unit: seconds.
+    :return: burst, or BURST_MIN_SEC.
+    """
+    return max(burst, BURST_MIN_SEC)
+
+
+def clamp_sweep_freq(freq):
+    """
+    Clamps a sweep frequency to the shaker's range, SWEEP_FREQ_MIN to SWEEP_FREQ_MAX Hz.
+
+    :param freq: Hertz (Hz), a number.
+    :return: freq, or the nearest end of the range.
+    """
+    return min(max(freq, SWEEP_FREQ_MIN), SWEEP_FREQ_MAX)
+
+
+def is_wave_streamed(config):
+    # Sweeps and long sine waves are streamed instead of generated in full
+    if config["wave_type"] == SWEEP_WAVE:
+        return True
+    return config["wave_type"] == W.SINE_WAVE and config["dur"] > STREAM_MIN_DUR_SEC
+
+
+def get_wave_key(config):
+    # Stimulus cache key of get_wave(): (wave type, amp, freq, duty cycle, duration, sample rate)
+    if config["wave_type"] == W.SINE_WAVE:
+        return W.SINE_WAVE, config["amp"], config["freq"], None, config["dur"], config["sample_rate"]
+    return W.PULSE_WAVE, config["amp"], config["freq"], config["duty_cycle"], config["dur"], config["sample_rate"]
+
+
+def get_wave(config, cache=None):
+    """
+    Generates the wave of an experiment config (sine or pulse, sweeps are only streamed, see get_wave_stream()).
+
+    :param config: experiment config (dictionary).
+    :param cache: module_wave_gen.StimulusCache, the wave is only generated if it is not in the cache. Can be None.
+    :return: wave_arr (for plotting), wave_snd (for playing sound).
+    """
+    amp = config["amp"]
+    freq = config["freq"]
+    dur = config["dur"]
+    sample_rate = config["sample_rate"]
+    cache_key = get_wave_key(config)
+
+    # tile=True only calculates one period of the wave, then repeats it to the duration.
+    if config["wave_type"] == W.SINE_WAVE:
+        print("Sine")
+        create_function = lambda: W.get_sine_wave(amp, freq, dur, sample_rate, tile=True)
+    else:
+        print("Pulse")
+        duty_cycle = config["duty_cycle"]
+        create_function = lambda: W.get_pulse_wave2(amp=amp, freq=freq, duty_cycle=duty_cycle, dur=dur,
+                                                    sample_rate=sample_rate, tile=True)
+
+    if cache is None:
+        return create_function()
+
+    wave = cache.get_or_create(cache_key, create_function)
+    print("Stimulus cache:", cache.hits, "hit(s),", cache.misses, "miss(es),", cache.num_bytes, "bytes")
+    return wave
+
+
+def get_wave_stream(config):
+    # Stream version of get_wave(), returns a new stream of mono blocks for every call
+    #   since a stream can only be played once.
+    # Note: Only sine waves and sweeps can be streamed for now.
+    amp = config["amp"]
+    dur = config["dur"]
+    sample_rate = config["sample_rate"]
+
+    if config["wave_type"] == W.SINE_WAVE:
+        return W.stream_sine_wave(amp, config["freq"], dur, sample_rate)
+
+    # Sweep: smooth chirp if step_freq is 0, else a stepped sweep
+    start_freq = config["start_freq"]
+    stop_freq = config["stop_freq"]
+    step_freq = config["step_freq"]
+    if step_freq == 0:
+        return W.stream_chirp(amp, start_freq, stop_freq, dur, config["sweep_type"], sample_rate)
+
+    # Stepped sweep, Duration is split evenly between the steps
+    num_steps = max(len(W.get_sweep_freqs(start_freq, stop_freq, step_freq)), 1)
+    return W.stream_stepped_sweep(amp, start_freq, stop_freq, step_freq, dur / num_steps, sample_rate)
+
+
+def get_burst_schedule(config):
+    """
+    Precomputes the random burst periods of a whole experiment (config["run_time"]) with a seeded
+    numpy.random.Generator, so the experiment loop only reads the next period, and a run can be
+    reproduced (same seed, same schedule) and checked afterwards (see save_burst_schedule()).
+
+    Periods are whole milliseconds, drawn from config["burst_distribution"] (see BURST_DISTRIBUTIONS)
+    with config["burst"] seconds as the longest (uniform) or average (exponential, poisson) period.
+
+    :param config: experiment config (dictionary). config["seed"] None draws a new seed.
+    :return: seed (an int), burst periods (numpy int64 array, unit: msec, one per burst).
+    """
+    seed = config["seed"]
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    rng = np.random.default_rng(seed)
+
+    distribution = config["burst_distribution"]
+    run_time_ms = int(config["run_time"] * 1000)
+    burst_ms = int(clamp_burst(config["burst"]) * 1000)
+    min_ms = RANDOM_BURST_MIN_SEC * 1000
+
+    def draw(size):
+        if distribution == BURST_UNIFORM:
+            return rng.integers(min_ms, max(burst_ms, min_ms), size=size, endpoint=True)
+        if distribution == BURST_EXPONENTIAL:
+            return min_ms + np.rint(rng.exponential(max(burst_ms - min_ms, 1), size=size)).astype(np.int64)
+        if distribution == BURST_POISSON:
+            # Every msec starts a burst with probability 1 / burst_ms, the waits are geometric (at least 1 msec)
+            return rng.geometric(1 / burst_ms, size=size).astype(np.int64)
+        raise ValueError(f"burst_distribution must be one of {BURST_DISTRIBUTIONS}, not {distribution}")
+
+    # Draw in chunks (about the expected number of bursts) until the experiment is covered
+    chunks = []
+    total_ms = 0
+    while total_ms < run_time_ms:
+        chunk = draw((run_time_ms - total_ms) // burst_ms + 16)
+        chunks.append(chunk)
+        total_ms += int(chunk.sum())
+    burst_periods_ms = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+
+    # Only the bursts that start before the end of the experiment
+    burst_starts_ms = np.cumsum(burst_periods_ms) - burst_periods_ms
+    return seed, burst_periods_ms[burst_starts_ms < run_time_ms]
+
+
+def get_schedule_path(config):
+    # File the random burst schedule is saved to: config["schedule_path"],
+    # next to the WAV file if the audio goes to one, else SCHEDULE_FILE_FORMAT (date and time of the run)
+    if config.get("schedule_path"):
+        return config["schedule_path"]
+    output = config.get("output") or {}
+    if output.get("backend") == W.AUDIO_BACKEND_WAV:
+        return os.path.splitext(output.get("path", W.WAV_FILE_DEFAULT))[0] + "_schedule.json"
+    return time.strftime(SCHEDULE_FILE_FORMAT)
+
+
+def save_burst_schedule(config, seed, burst_periods_ms):
+    """
+    Saves a random burst schedule with its seed and the experiment config as JSON (get_schedule_path()),
+    so the run can be checked afterwards, or repeated (put the seed into the config).
+
+    :param config: experiment config (dictionary).
+    :param seed: an int, seed of the schedule.
+    :param burst_periods_ms: numpy int array, unit: msec, burst periods from get_burst_schedule().
+    :return: a str, path of the JSON file.
+    """
+    path = get_schedule_path(config)
+    burst_starts_ms = np.cumsum(burst_periods_ms) - burst_periods_ms
+    schedule = {"created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "seed": int(seed),
+                "burst_distribution": config["burst_distribution"],
+                "num_bursts": len(burst_periods_ms),
+                "burst_starts_ms": burst_starts_ms.tolist(),
+                "burst_periods_ms": burst_periods_ms.tolist(),
+                "config": dict(config, seed=int(seed))}
+    with open(path, "w") as schedule_file:
+        json.dump(schedule, schedule_file, indent=4)
+    return path
+
+
+def get_wave_start(config, num_samples):
+    """
+    First num_samples of the wave of an experiment config (1-D), without generating (or caching) the whole wave,
+    so it works for streamed waves and waves too big for the stimulus cache.
+
+    :param config: experiment config (dictionary).
+    :param num_samples: an int, number of samples.
+    :return: 1-D int16 array (shorter if the wave is shorter).
+    """
+    sample_rate = config["sample_rate"]
+    num_samples = min(num_samples, W.get_num_samples(config["dur"], sample_rate))
+
+    if not is_wave_streamed(config):
+        # Same tiled generation as get_wave(), only num_samples long
+        dur = num_samples / sample_rate
+        if config["wave_type"] == W.SINE_WAVE:
+            wave_arr, wave_snd = W.get_sine_wave(config["amp"], config["freq"], dur, sample_rate, tile=True)
+        else:
+            wave_arr, wave_snd = W.get_pulse_wave2(amp=config["amp"], freq=config["freq"],
+                                                   duty_cycle=config["duty_cycle"], dur=dur,
+                                                   sample_rate=sample_rate, tile=True)
+        return wave_arr
+
+    # Only the first blocks of the stream (a sweep keeps the speed of the whole duration)
+    blocks = []
+    num_left = num_samples
+    for block in get_wave_stream(config):
+        if num_left <= 0:
+            break
+        blocks.append(block[:num_left])
+        num_left -= len(blocks[-1])
+    return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.int16)
+
+
+def get_wave_columns(config, num_columns):
+    """
+    Decimated wave of one burst (the part played every burst), for drawing (see module_wave_gen.get_min_max_columns()),
+    in milliseconds for any duration, streamed or not, without rendering the whole wave.
+
+    If every column is longer than one period of the wave (the longest period, for sweeps),
+    every column has the same smallest and largest sample, so only one period is generated.
+    Otherwise the burst is short (at most num_columns periods), and all of it is generated.
+
+    :param config: experiment config (dictionary).
+    :param num_columns: an int, number of columns (e.g. width of the graph in pixels).
+    :return: mins, maxs (numpy arrays, one value per column), and num_samples (an int, samples of one burst).
+    """
+    sample_rate = config["sample_rate"]
+    num_samples = W.get_num_samples(min(clamp_burst(config["burst"]), config["dur"]), sample_rate)
+
+    if config["wave_type"] == SWEEP_WAVE:
+        freq = min(config["start_freq"], config["stop_freq"])
+    else:
+        freq = config["freq"]
+
+    if freq > 0:
+        period_samples = int(np.ceil(sample_rate / freq))
+        if num_samples > num_columns * period_samples:
+            period = get_wave_start(config, period_samples)
+            return np.full(num_columns, period.min()), np.full(num_columns, period.max()), num_samples
+
+    mins, maxs = W.get_min_max_columns(get_wave_start(config, num_samples), num_columns)
+    return mins, maxs, num_samples
+
+
+def get_envelope_columns(config, num_columns, burst_periods_ms=None):
+    """
+    Decimated burst/silence envelope of the whole experiment (config["run_time"]), for drawing:
+    for every column (pixel), the smallest and largest sample, -amp and amp if a burst plays in the column,
+    0 and 0 if the column is only silence. Same burst timing as run_experiment().
+    Random bursts are drawn from their schedule (burst_periods_ms), or with the longest burst period (config["burst"]).
+
+    :param config: experiment config (dictionary).
+    :param num_columns: an int, number of columns (e.g. width of the graph in pixels).
+    :param burst_periods_ms: numpy int array, unit: msec, random burst schedule (get_burst_schedule()). Can be None.
+    :return: mins, maxs (numpy arrays, one value per column).
+    """
+    run_time = config["run_time"]
+    burst_sec = clamp_burst(config["burst"])
+    # Burst plays for the wave's duration, or the whole burst period if the wave is longer
+    play_sec = min(burst_sec, int(config["dur"]))
+
+    # Start time and width of every column (seconds)
+    column_sec = run_time / num_columns
+    if burst_periods_ms is not None:
+        # Columns from the one a burst starts in to the one it ends in have audio.
+        # +1 at the first column and -1 after the last column of every burst, then a running sum.
+        burst_periods = burst_periods_ms / 1000
+        burst_starts = np.cumsum(burst_periods) - burst_periods
+        burst_ends = burst_starts + np.minimum(burst_periods, int(config["dur"]))
+        first_columns = np.clip(np.floor(burst_starts / column_sec).astype(int), 0, num_columns)
+        end_columns = np.clip(np.ceil(burst_ends / column_sec).astype(int), 0, num_columns)
+        num_playing = np.zeros(num_columns + 1, dtype=int)
+        np.add.at(num_playing, first_columns, 1)
+        np.add.at(num_playing, end_columns, -1)
+        is_playing = np.cumsum(num_playing[:-1]) > 0
+    else:
+        column_starts = np.arange(num_columns) * column_sec
+        # A column has audio if it starts during a burst, or reaches the start of the next burst
+        phase = column_starts % burst_sec
+        is_playing = (phase < play_sec) | (phase + column_sec > burst_sec)
+
+    maxs = np.where(is_playing, config["amp"], 0)
+    return -maxs, maxs
+
+
+class StimulusRenderer:
+    """
+    Renders the wave of an experiment config in the background (pre-rendering) into a stimulus cache,
+    so "Play Audio Sample" and "Start Experiment" find it there and start right away.
+
+    request(config) is called on every parameter edit. Rendering only starts after delay seconds without
+    a new request (debounce, e.g. while typing a frequency), on a threading.Timer.
+    A new request (or cancel()) cancels the waiting render, a render that already started is stale:
+    it finishes (numpy can not be interrupted), but its wave is not put into the cache.
+
+    Streamed waves (see is_wave_streamed()) and waves too big for the cache are not pre-rendered.
+    report(key, value) gets STIMULUS_RENDERED_EVENT when a wave is put into the cache (e.g. to draw a preview).
+
+    Example:
+        renderer = StimulusRenderer(stimulus_cache)
+        renderer.request(config)    # on every edit
+        ...
+        wave_arr, wave_snd = renderer.get_wave(config)    # on Play, waits for a render of the same wave
+    """
+
+    def __init__(self, cache, delay=PRERENDER_DELAY_SEC, report=None):
+        self.cache = cache
+        self.delay = delay
+        self.report_function = report
+        # Incremented by every request() and cancel(), a render of an older generation is stale
+        self.generation = 0
+        self.timer = None
+        # Cache key of the latest render in progress, and its Event (set when it is done)
+        self.rendering_key = None
+        self.rendered_event = None
+        self.lock = threading.Lock()
+
+    def request(self, config):
+        # Renders the wave of config after delay seconds, unless request() or cancel() is called again before
+        self.cancel()
+        if is_wave_streamed(config):
+            return
+        num_bytes = W.get_num_samples(config["dur"], config["sample_rate"]) * 2 * W.SOUND_CHANNELS
+        if num_bytes > self.cache.max_bytes or get_wave_key(config) in self.cache:
+            return
+
+        with self.lock:
+            self.timer = threading.Timer(self.delay, self.render, args=(self.generation, config))
+            self.timer.daemon = True
+            self.timer.start()
+
+    def cancel(self):
+        # Cancels the waiting render, and makes the render in progress stale
+        with self.lock:
+            self.generation += 1
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+    def render(self, generation, config):
+        # Runs on the timer's thread
+        key = get_wave_key(config)
+        rendered_event = threading.Event()
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.rendering_key = key
+            self.rendered_event = rendered_event
+
+        try:
+            print("Pre-rendering stimulus:", key)
+            wave = get_wave(config)
+            with self.lock:
+                is_stale = generation != self.generation
+                if not is_stale:
+                    self.cache.put(key, wave)
+            if is_stale:
+                print("Stale stimulus discarded:", key)
+            elif self.report_function is not None:
+                self.report_function(STIMULUS_RENDERED_EVENT, key)
+        finally:
+            with self.lock:
+                # A newer render may have started in the meantime (this one was stale)
+                if self.rendered_event is rendered_event:
+                    self.rendering_key = None
+                    self.rendered_event = None
+            rendered_event.set()
+
+    def get_wave(self, config):
+        # get_wave() with the cache, waits for a render of the same wave in progress instead of rendering it again
+        with self.lock:
+            rendered_event = self.rendered_event if self.rendering_key == get_wave_key(config) else None
+        if rendered_event is not None:
+            rendered_event.wait()
+        return get_wave(config, self.cache)
+
+
+def set_audio_output(output=None):
+    # Selects the audio backend of a config's "output" (see module_wave_gen.set_audio_backend()), returns the engine
+    output = dict(output or {})
+    backend = output.pop("backend", W.AUDIO_BACKEND_MIXER)
+    if output.get("path"):
+        print("Writing audio to", output["path"])
+    return W.set_audio_backend(backend, **output)
+
+
+def run_experiment(config, stop_event=None, report=None, wave_snd=None):
+    """
+    Runs an experiment: bursts of the wave at absolute deadlines (BurstScheduler) for config["run_time"] seconds.
+    Returns early when stop_event is set.
+
+    :param config: experiment config (dictionary).
+    :param stop_event: threading.Event (or multiprocessing.Event), ends the current wait right away when set.
+    :param report: function report(key, value), gets EXPERIMENT_PROGRESS_EVENT (see ProgressReporter). Can be None.
+    :param wave_snd: the wave, already generated (e.g. from shared memory). Generated from config if None.
+    :return: a float, unit: seconds, how long the experiment ran.
+    """
+    if stop_event is None:
+        stop_event = threading.Event()
+
+    print("===================================================")
+    print("Press Spacebar or Stop Experiment to STOP the experiment!")
+    print("===================================================")
+
+    expected_run_time = config["run_time"]
+    print("expected_run_time:", expected_run_time, "seconds")
+
+    # Sweeps and long sine waves are streamed every burst, so the whole wave is never held in memory.
+    is_streamed = is_wave_streamed(config)
+    if is_streamed:
+        wave_duration_sec = int(config["dur"])
+    else:
+        if wave_snd is None:
+            wave_arr, wave_snd = get_wave(config)
+        # Duration in seconds, number of samples divided by sample rate
+        wave_duration_sec = int(len(wave_snd) / config["sample_rate"])
+
+    # Random burst periods are drawn before the experiment starts (seeded, saved for checking or repeating the run),
+    # the loop only reads the next one
+    burst_periods = None
+    if config["random_burst"]:
+        seed, burst_periods_ms = get_burst_schedule(config)
+        schedule_path = save_burst_schedule(config, seed, burst_periods_ms)
+        print(f"Random Burst ({config['burst_distribution']}) is Selected! Seed: {seed}, "
+              f"{len(burst_periods_ms)} bursts, schedule saved to {schedule_path}")
+        burst_periods = (burst_periods_ms / 1000).tolist()
+
+    # Elapsed time uses the audio engine's clock:
+    # real time for the speakers, seconds of audio written for the null and WAV file outputs (so they can run faster)
+    # The output is selected last, the finally below always goes back to the speakers.
+    engine = set_audio_output(config.get("output"))
+
+    # Bursts are played on one channel (bursts never overlap).
+    # The player makes the burst Sound once, so every burst only hands the Sound to the audio engine.
+    # Every wait of the player ends right away when stop_event is set (Stop Experiment button or spacebar).
+    player = W.BurstPlayer(engine, sample_rate=config["sample_rate"], stop_event=stop_event)
+
+    # Every burst starts at an absolute deadline (start of the experiment + burst periods before it),
+    # so waiting, Python overhead and wave generation never add up over a long experiment (no drift).
+    # The player's clock is when the next queued sound starts, so bursts and silences can be queued ahead (gapless).
+    scheduler = BurstScheduler(clock=player.get_time)
+    scheduler.start()
+
+    # Progress goes to report() from the reporter's thread, throttled to PROGRESS_INTERVAL_SEC
+    reporter = None
+    if report is not None:
+        reporter = ProgressReporter(report, scheduler, expected_run_time, clock=engine.get_time)
+        reporter.start()
+
+    # The sound, the reporter and the audio output are always stopped (see finally), even if the experiment fails
+    try:
+        # Only start bursts that are due before the end of the experiment
+        while scheduler.get_next_elapsed() < expected_run_time:
+            burst_sec = clamp_burst(config["burst"])
+
+            # If random burst selected, burst_sec is the next period of the precomputed schedule
+            if burst_periods is not None:
+                num_bursts = len(scheduler.lateness)
+                if num_bursts >= len(burst_periods):
+                    break
+                burst_sec = burst_periods[num_bursts]
+                print("Random burst_sec:", burst_sec)
+
+            # Compare Burst with Duration, choose smaller for wave playback.
+            # The silence (burst - duration) is the wait until the next burst's deadline, burst_sec after this one's.
+            wave_duration_ms = int(1000 * min(burst_sec, wave_duration_sec))
+            print("Will play audio for:", wave_duration_ms / 1000, "seconds")
+
+            if is_streamed:
+                burst_snd = get_wave_stream(config)
+            else:
+                burst_snd = wave_snd
+
+            # Wait (silence) until this burst's deadline, then play the audio to the desired duration.
+            # Both return False if the experiment was stopped
+            if player.wait_until(scheduler.next_deadline):
+                lateness = scheduler.start_burst(burst_sec)
+                # Only stores the progress (no GUI or queue call), queueing the burst can block until it is written
+                if reporter is not None:
+                    reporter.update(burst_sec, lateness)
+                player.queue_burst(burst_snd, wave_duration_ms)
+                print(f"Burst {len(scheduler.lateness)} lateness: {lateness * 1000:.2f} msec")
+
+            if stop_event.is_set():
+                print("Stopping experiment")
+                break
+
+            elapsed_time = scheduler.get_elapsed()
+            print("Experiment elapsed_time:", elapsed_time, "second(s)")
+
+        # Let the last burst and its silence finish, unless the experiment was stopped
+        if not stop_event.is_set():
+            player.wait_until(scheduler.next_deadline)
+            player.wait_done()
+    finally:
+        player.stop()
+        # Sends the final progress
+        if reporter is not None:
+            reporter.stop()
+        # Goes back to the speakers (pygame.mixer), which also closes the WAV file (or the stream's audio device),
+        #   so a failed run never leaves the output switched
+        W.set_audio_backend(W.AUDIO_BACKEND_MIXER)
+
+    elapsed_time = scheduler.get_elapsed()
+    print(f"Experiment has run for {elapsed_time:.2f} seconds")
+    scheduler.print_report()
+    # Convert seconds to hours, then the decimal hours (% 1) to minutes
+    hours_elapsed = elapsed_time / 60 / 60
+    min_elapsed = (hours_elapsed % 1) * 60
+    print(f"or {hours_elapsed:.1f} hour(s) and {min_elapsed:.1f} minute(s)")
+    # Bursts are queued (or written) ahead of time, see module_wave_gen.BurstPlayer.get_time()
+    print("Note: lateness is measured on the audio clock, a burst is only late if the output ran out of sound before it")
+
+    return elapsed_time
+
+
+class ExperimentWorker(threading.Thread):
+    """
+    Background thread that owns a whole experiment, so the GUI thread never waits on it.
+     - Progress goes back through report(key, value), e.g. window.write_event_value() (thread safe),
+       the worker never touches the GUI itself.
+     - Commands come in through the commands queue (stop() puts STOP_COMMAND).
+       They are handled by a small command thread, so a stop ends the experiment's current wait right away
+       (stop_event), even in the middle of a long silence.
+
+    experiment_function(worker) runs the experiment, it should use worker.stop_event for its waits
+    (e.g. module_wave_gen.BurstPlayer(stop_event=worker.stop_event)) and worker.report() for progress.
+    Its return value is sent with EXPERIMENT_DONE_EVENT.
+    Runs in the GUI's process, see ExperimentProcess for a separate process.
+
+    Example:
+        worker = ExperimentWorker(lambda worker: run_experiment(config, worker.stop_event, worker.report),
+                                  report=window.write_event_value)
+        worker.start()
+        ...
+        worker.stop()  # e.g. when the Stop Experiment button is pressed
+    """
+
+    def __init__(self, experiment_function, report=None):
+        super().__init__(daemon=True)
+        self.experiment_function = experiment_function
+        self.report_function = report
+        self.commands = queue.Queue()
+        # Set by the command thread when STOP_COMMAND comes in
+        self.stop_event = threading.Event()
+
+    def run(self):
+        command_thread = threading.Thread(target=self.handle_commands, daemon=True)
+        command_thread.start()
+
+        result = None
+        try:
+            result = self.experiment_function(self)
+        finally:
+            # Ends the command thread, then tells the GUI the experiment is over (also if it crashed)
+            self.commands.put(None)
+            self.report(EXPERIMENT_DONE_EVENT, result)
+
+    def handle_commands(self):
+        # Runs in the command thread, until run() puts None
+        while True:
+            command = self.commands.get()
+            if command is None:
+                return
+            if command == STOP_COMMAND:
+                self.stop_event.set()
+
+    def stop(self):
+        # Asks the experiment to stop (can be called from any thread)
+        self.commands.put(STOP_COMMAND)
+
+    def is_stopped(self):
+        return self.stop_event.is_set()
+
+    def report(self, key, value=None):
+        # Sends a report to the GUI (nothing if there is no report function)
+        if self.report_function is not None:
+            self.report_function(key, value)
+
+
+class ExperimentProcess:
+    """
+    Runs run_experiment() in a separate process, so the GUI (garbage collection, redraws...) can never
+    delay a burst, and the experiment can be ended right away (terminate()).
+
+    The config is pickled to the process. The wave (wave_snd) is copied once into shared memory,
+    the process uses it from there (no copy, no pickling of a large array).
+    Streamed waves (see is_wave_streamed()) are generated by the process itself.
+
+    Same interface as ExperimentWorker: start(), stop(), is_alive(), and report(key, value) gets the
+    EXPERIMENT_PROGRESS_EVENT and EXPERIMENT_DONE_EVENT reports (from a thread that reads the process' queue).
+
+    Example:
+        runner = ExperimentProcess(config, wave_snd, report=window.write_event_value)
+        runner.start()
+        ...
+        runner.stop()
+    """
+
+    def __init__(self, config, wave_snd=None, report=None):
+        # multiprocessing is only imported when an experiment process is made (keeps the GUI's startup fast)
+        import multiprocessing
+
+        self.config = config
+        self.wave_snd = wave_snd
+        self.report_function = report
+        self.stop_event = multiprocessing.Event()
+        self.report_queue = multiprocessing.Queue()
+        self.process = None
+        self.shared_wave = None
+        self.report_thread = None
+
+    def start(self):
+        import multiprocessing
+        from multiprocessing import shared_memory
+
+        wave_info = None
+        if self.wave_snd is not None:
+            # Copy the wave into shared memory, the process only gets its name, shape and dtype
+            self.shared_wave = shared_memory.SharedMemory(create=True, size=max(self.wave_snd.nbytes, 1))
+            shared_snd = np.ndarray(self.wave_snd.shape, dtype=self.wave_snd.dtype, buffer=self.shared_wave.buf)
+            shared_snd[:] = self.wave_snd
+            wave_info = (self.shared_wave.name, self.wave_snd.shape, self.wave_snd.dtype.str)
+            del shared_snd
+
+        self.process = multiprocessing.Process(target=run_experiment_process, daemon=True,
+                                               args=(self.config, wave_info, self.stop_event, self.report_queue))
+        self.process.start()
+
+        self.report_thread = threading.Thread(target=self.handle_reports, daemon=True)
+        self.report_thread.start()
+
+    def handle_reports(self):
+        # Passes the process' reports on (report thread), until EXPERIMENT_DONE_EVENT or the process ended
+        while True:
+            try:
+                key, value = self.report_queue.get(timeout=STOP_TIMEOUT_SEC)
+            except queue.Empty:
+                if self.process.is_alive():
+                    continue
+                # Process was terminated (or crashed) before it could report
+                key, value = EXPERIMENT_DONE_EVENT, None
+
+            if key == EXPERIMENT_DONE_EVENT:
+                self.process.join()
+                self.release_shared_wave()
+                self.report(key, value)
+                return
+            self.report(key, value)
+
+    def stop(self):
+        # Asks the process to stop (ends its current wait right away), terminates it if it does not end in time
+        self.stop_event.set()
+        threading.Timer(STOP_TIMEOUT_SEC, self.terminate).start()
+
+    def terminate(self):
+        # Ends the process right away (the audio stops mid burst)
+        if self.process is not None and self.process.is_alive():
+            print("Terminating experiment process")
+            self.process.terminate()
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def is_stopped(self):
+        return self.stop_event.is_set()
+
+    def release_shared_wave(self):
+        if self.shared_wave is not None:
+            self.shared_wave.close()
+            self.shared_wave.unlink()
+            self.shared_wave = None
+
+    def report(self, key, value=None):
+        if self.report_function is not None:
+            self.report_function(key, value)
+
+
+def run_experiment_process(config, wave_info, stop_event, report_queue):
+    """
+    Target of ExperimentProcess (runs in the experiment process).
+
+    :param config: experiment config (dictionary).
+    :param wave_info: (shared memory name, shape, dtype) of the wave, None if the wave is streamed.
+    :param stop_event: multiprocessing.Event, set by ExperimentProcess.stop().
+    :param report_queue: multiprocessing.Queue, gets the (key, value) reports.
+    """
+    from multiprocessing import shared_memory
+
+    report = lambda key, value=None: report_queue.put((key, value))
+
+    shared_wave = None
+    wave_snd = None
+    if wave_info is not None:
+        name, shape, dtype = wave_info
+        shared_wave = shared_memory.SharedMemory(name=name)
+        wave_snd = np.ndarray(shape, dtype=dtype, buffer=shared_wave.buf)
+
+    elapsed_time = None
+    try:
+        elapsed_time = run_experiment(config, stop_event, report, wave_snd)
+    finally:
+        W.audio_engine.stop()
+        # BurstPlayer keeps no reference to wave_snd after the experiment, so the shared memory can be closed
+        del wave_snd
+        if shared_wave is not None:
+            shared_wave.close()
+        report(EXPERIMENT_DONE_EVENT, elapsed_time)
+
+
+def main():
+    print("main")
+
+    # --------------------------------
+    # Test BurstScheduler: 10 bursts of 0.2 sec, sleeping until every deadline
+    # --------------------------------
+    # scheduler = BurstScheduler()
+    # scheduler.start()
+    # while scheduler.get_next_elapsed() < 2.0:
+    #     time.sleep(max(scheduler.get_time_to_wait(), 0))
+    #     lateness = scheduler.start_burst(0.2)
+    #     print(f"Burst lateness: {lateness * 1000:.2f} msec")
+    #     time.sleep(0.05)  # some work, is not added to the next deadline
+    # scheduler.print_report()
+
+    # --------------------------------
+    # Test ExperimentWorker: stop an experiment waiting 60 sec after 1 sec
+    # --------------------------------
+    # worker = ExperimentWorker(lambda worker: worker.stop_event.wait(60), report=print)
+    # worker.start()
+    # time.sleep(1)
+    # worker.stop()
+    # worker.join()
+
+    pass
+
+
+if __name__ == "__main__":
+    main()
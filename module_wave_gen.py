@@ -19,30 +19,233 @@ Note: Burst Period can cut into wave creation, so will only be applied on playba
 If Burst Period is larger than Duration, silence will be "added".
 If Burst Period is less than Duration, then audio playback will be cut short.
 
-TODO: Try Pulse Gen following Example 1 from MIT:
-https://www.programcreek.com/python/example/100545/scipy.signal.square
+Pulse waves used to be generated with scipy.signal.square, they are now generated from
+integer sample indices (fill_pulse_wave()), so SciPy is no longer needed.
+Run benchmark_pulse_wave() to compare both.
 """
 
-import matplotlib.pyplot as plt
+import functools
+import math
 import numpy as np
 import pygame
+import threading
+import time
+import wave
 
-from scipy import signal
+from collections import OrderedDict
+from fractions import Fraction
 
 # Used for calculating duration of wave audio
 # TODO: Change code in this module to use this constant
 SAMPLE_RATE_DEFAULT = 44100
 
+# Number of channels of the sound arrays (*_snd) returned by the get_*_wave() functions.
+# With 1 channel the sound arrays are 1-D and the plotting array is the sound array itself.
+# Note: pygame usually opens the audio device in stereo, even when pygame.mixer.init() asks for 1 channel,
+#       which is why the sound arrays used to be 2 columns (np.c_[arr, arr]).
+#       The mixer is now initialized with MIXER_ALLOWED_CHANGES, so it stays mono and SDL does the stereo conversion.
+SOUND_CHANNELS = 1
+
+# Passed to pygame.mixer.init(allowedchanges=...): allow a different frequency, but not a different number of channels
+MIXER_ALLOWED_CHANGES = pygame.AUDIO_ALLOW_FREQUENCY_CHANGE
+
+# Number of samples per block when streaming a wave (stream_* functions).
+# 4096 samples is about 93 msec of audio at 44100 Hz.
+BLOCK_SIZE_DEFAULT = 4096
+
+
+# Wave types, used for period rendering/caching (get_period_wave())
+SINE_WAVE = "sine"
+PULSE_WAVE = "pulse"
+
+# Sweep types, used by stream_chirp()
+SWEEP_LINEAR = "linear"
+SWEEP_LOG = "log"
+
+# Max number of single period waves kept by get_period_wave()
+PERIOD_CACHE_SIZE = 32
+# Max number of samples of a cached period (get_period_wave(), get_pulse_cycle()), about 4 seconds at 44100 Hz.
+# A frequency like 199.999 Hz needs 44,100,000 samples to land on a whole number of samples,
+# so longer periods are generated directly instead of being cached and tiled.
+PERIOD_MAX_SAMPLES = 4 * 44100
+
+# DDS (direct digital synthesis) oscillator settings, see DDSOscillator
+# Phase accumulator is a 64 bit unsigned integer (one full period is 2**64)
+DDS_PHASE_BITS = 64
+# Sine lookup table has 2**16 entries, max error is about 1 LSB at amp 16000
+DDS_TABLE_BITS = 16
+
+# Default memory budget of a StimulusCache, in bytes (64 MB)
+STIMULUS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Startup budget (seconds) of each program's imports, see benchmark_startup().
+# Heavy modules (matplotlib, SciPy, multiprocessing) are only imported when first used to stay within it.
+STARTUP_BUDGETS_SEC = {"FlyShakerGUI": 0.6, "FlyShakerCLI": 0.4}
+
+# Audio backends, see set_audio_backend()
+# mixer: pygame.mixer Sounds (AudioEngine), the whole burst is held in memory
+# stream: audio callback pulling blocks through a ring buffer (StreamEngine), memory is one ring buffer
+# null: no output, samples are consumed at real time or faster (NullEngine), for machines without audio hardware
+# wav: samples are written into a WAV file (WavFileEngine)
+AUDIO_BACKEND_MIXER = "mixer"
+AUDIO_BACKEND_STREAM = "stream"
+AUDIO_BACKEND_NULL = "null"
+AUDIO_BACKEND_WAV = "wav"
+
+# Default file of WavFileEngine
+WAV_FILE_DEFAULT = "experiment.wav"
+
+# Number of samples the audio device asks for per callback (StreamEngine), about 23 msec at 44100 Hz
+STREAM_CALLBACK_SAMPLES = 1024
+# Size of the StreamEngine ring buffer, in callbacks (4 * 1024 samples is about 93 msec at 44100 Hz)
+STREAM_BUFFER_BLOCKS = 4
+
+
+class StimulusCache:
+    """
+    Least recently used (LRU) cache of generated waves, so the same stimulus is not generated twice.
+    The cache is limited by the total size of the cached arrays (max_bytes), not by the number of stimuli.
+    The least recently used stimuli are removed first when it is full.
+
+    Key: any hashable, e.g. (wave type, amp, freq, duty cycle, duration, sample rate).
+    Value: tuple of numpy arrays, e.g. (wave_arr, wave_snd) from get_sine_wave().
+
+    hits and misses count how many get() calls found (or did not find) their stimulus.
+    Thread safe, stimuli can be put into the cache from a background thread (pre-rendering).
+    """
+
+    def __init__(self, max_bytes=STIMULUS_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        # Returns the cached arrays, or None if key is not cached
+        with self._lock:
+            arrays = self._items.get(key)
+            if arrays is None:
+                self.misses += 1
+                return None
+
+            # Most recently used goes to the end
+            self._items.move_to_end(key)
+            self.hits += 1
+            return arrays
+
+    def put(self, key, arrays):
+        # Adds arrays to the cache, removing least recently used stimuli until it fits.
+        # Arrays bigger than max_bytes are not cached.
+        num_bytes = get_nbytes(arrays)
+        if num_bytes > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._items:
+                self.num_bytes -= get_nbytes(self._items.pop(key))
+
+            while self._items and self.num_bytes + num_bytes > self.max_bytes:
+                _, old_arrays = self._items.popitem(last=False)
+                self.num_bytes -= get_nbytes(old_arrays)
+
+            self._items[key] = arrays
+            self.num_bytes += num_bytes
+
+    def get_or_create(self, key, create_function):
+        # Returns the cached arrays, or calls create_function() to generate (and cache) them
+        arrays = self.get(key)
+        if arrays is None:
+            arrays = create_function()
+            self.put(key, arrays)
+        return arrays
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.num_bytes = 0
+
+
+def get_nbytes(arrays):
+    """
+    Gets the memory used by arrays, counting shared memory only once
+    (e.g. wave_arr is a view of wave_snd, see new_sound_array()).
+
+    :param arrays: iterable of numpy arrays.
+    :return: an int, number of bytes.
+    """
+    buffers = {}
+    for arr in arrays:
+        base = arr if arr.base is None else arr.base
+        buffers[id(base)] = base.nbytes
+    return sum(buffers.values())
+
+
+def new_sound_array(num_samples, channels=None):
+    """
+    Allocates the plotting array and the sound array (for pygame) of a wave as one int16 buffer.
+    snd has one column per channel (interleaved, the layout pygame expects)
+    and arr is a view of its first column, so no separate copy is made for plotting.
+    With 1 channel, arr and snd are the same 1-D array.
+
+    :param num_samples: an int, number of samples of the wave.
+    :param channels: an int, number of channels of snd. Default is SOUND_CHANNELS.
+    :return: arr (1-D view, for plotting), snd (for audio playback in pygame)
+    """
+    if channels is None:
+        channels = SOUND_CHANNELS
+
+    if channels == 1:
+        snd = np.empty(num_samples, dtype=np.int16)
+        return snd, snd
+
+    snd = np.empty((num_samples, channels), dtype=np.int16)
+    return snd[:, 0], snd
+
+
+def write_sound_array(snd, wave):
+    """
+    Writes a mono wave into every channel of snd (from new_sound_array()),
+    converting it to 16 bit integers in the same pass (same as wave.astype(np.int16)).
 
-def get_sine_wave(amp=16000, freq=200, dur=1.0, sample_rate=44100):
+    :param snd: int16 array from new_sound_array().
+    :param wave: 1-D array of len(snd) values.
+    """
+    if snd.ndim == 1:
+        snd[...] = wave
+    else:
+        snd[...] = wave[:, np.newaxis]
+
+
+def get_num_samples(dur=1.0, sample_rate=44100):
+    """
+    Gets the number of samples needed for a wave of dur seconds.
+
+    :param dur: a float, unit: seconds.
+    :param sample_rate: Hz, number of samples for a second.
+    :return: an int, number of samples.
+    """
+    return int(round(dur * sample_rate))
+
+
+def get_sine_wave(amp=16000, freq=200, dur=1.0, sample_rate=44100, tile=False, workspace=None):
     """
     Generates 2 arrays:
      1. sine_arr: single row vector for plotting
-     2. sine_snd: 2 row vector for playing back using pygame.
+     2. sine_snd: array for playing back using pygame.
                   Johnny note: Each vector is a channel, so 2 channels, or stereo.
                                Pygame requires stereo audio
                                even though pygame.mixer is init as 1 channel.
                                Requires further research.
+                  Update: pygame opens the device in stereo unless allowedchanges says otherwise,
+                          see SOUND_CHANNELS and new_sound_array(). sine_arr is a view of sine_snd, not a copy.
 
     :param amp: Amplitude of sine wave. Max is 32000 (as per Tom). Default 16000.
     :param freq: Hertz (Hz), Frequency of sine wave (Note: 1/freq is the period).
@@ -51,9 +254,23 @@ def get_sine_wave(amp=16000, freq=200, dur=1.0, sample_rate=44100):
     :param sample_rate: Hz, number of samples for a second.
                         Default is 44100 Hz.
                         TODO: Research this, related to pygame.mixer.init()?
+    :param tile: a bool, if True only one period is calculated (and cached), then repeated to dur.
+    :param workspace: WaveWorkspace, if given the wave is calculated in float32 using its reusable buffers,
+                      so only the returned int16 array is allocated (ignored if tile is True).
     :return: sine_arr (for plotting), sine_snd (sound array for playback.
     """
 
+    # Periods longer than PERIOD_MAX_SAMPLES are not cached, they are generated directly below
+    if tile and is_period_cacheable(freq, sample_rate):
+        arr, snd = new_sound_array(get_num_samples(dur, sample_rate))
+        tile_wave(get_period_wave(SINE_WAVE, amp, freq, sample_rate=sample_rate), out=snd)
+        return arr, snd
+
+    if workspace is not None:
+        arr, snd = new_sound_array(get_num_samples(dur, sample_rate))
+        workspace.fill_sine(snd, amp, freq, sample_rate)
+        return arr, snd
+
     # Generate time array used to create sine wave (usually the x-axis)
 
     ts = 1.0/sample_rate  # time step size
@@ -83,18 +300,544 @@ def get_sine_wave(amp=16000, freq=200, dur=1.0, sample_rate=44100):
     # Makes sure sound is 16 bit integers, as pygame.mixer is initialized to 16 bits.
     # Source: https://stackoverflow.com/a/10690879
     #         John, Canada, May 21, 2012
-    arr = sine_wave.astype(np.int16)
+    # Create pygame.mixer compatible array: the int16 conversion is written straight into every channel,
+    #   instead of making an int16 copy, then a stereo copy with np.c_[arr, arr].
+    arr, snd = new_sound_array(len(sine_wave))
+    write_sound_array(snd, sine_wave)
 
-    # Create pygame.mixer compatible array
-    arr2 = np.c_[arr,arr]
-
-    # sine_arr: for plotting (a vector)
-    # sine_snd: sine sound (snd) for audio playback in pygame (2 row vectors, or stereo)
+    # sine_arr: for plotting (a vector, view of sine_snd's first channel)
+    # sine_snd: sine sound (snd) for audio playback in pygame (one column per channel, or stereo)
     sine_arr = arr
-    sine_snd = arr2
+    sine_snd = snd
     return sine_arr, sine_snd
 
 
+def get_period_num_samples(freq=200, sample_rate=44100):
+    """
+    Gets the number of samples for the smallest whole number of periods that lands on an integer sample count.
+    For example, 200 Hz at 44100 Hz is 220.5 samples per period, so 2 periods (441 samples) are used.
+
+    Note: freq is rounded to 1/1000 Hz, so the number of periods used is never more than 1000 * freq.
+
+    :param freq: Hertz (Hz), frequency of the wave.
+    :param sample_rate: Hz, number of samples for a second.
+    :return: an int, number of samples.
+    """
+    # samples per period = sample_rate / freq = num_samples / num_periods (reduced fraction)
+    samples_per_period = Fraction(sample_rate) / Fraction(freq).limit_denominator(1000)
+    return samples_per_period.numerator
+
+
+def is_period_cacheable(freq=200, sample_rate=44100):
+    """
+    Checks if the period of a wave (see get_period_num_samples()) is short enough to be cached by get_period_wave(),
+    i.e. it is at most PERIOD_MAX_SAMPLES samples.
+
+    :param freq: Hertz (Hz), frequency of the wave.
+    :param sample_rate: Hz, number of samples for a second.
+    :return: a bool.
+    """
+    return get_period_num_samples(freq, sample_rate) <= PERIOD_MAX_SAMPLES
+
+
+@functools.lru_cache(maxsize=PERIOD_CACHE_SIZE)
+def get_period_wave(wave_type=SINE_WAVE, amp=16000, freq=200, duty_cycle=0.5, sample_rate=44100):
+    """
+    Generates (and caches) the smallest whole number of periods of a wave, see get_period_num_samples().
+    Use tile_wave() to extend it to any duration, or play it as a looped Sound (play_looped()).
+
+    Note: The returned array is shared by the cache, so it is read-only.
+          Periods longer than PERIOD_MAX_SAMPLES raise a ValueError, check is_period_cacheable() first.
+
+    :param wave_type: SINE_WAVE or PULSE_WAVE.
+    :param amp: Amplitude of wave. Max is 32000 (as per Tom).
+    :param freq: Hertz (Hz), frequency of wave.
+    :param duty_cycle: a float, value from 0 to 1; no unit. Only used by PULSE_WAVE.
+    :param sample_rate: Hz, number of samples for a second.
+    :return: 1-D int16 array (read-only).
+    """
+    num_samples = get_period_num_samples(freq, sample_rate)
+    if num_samples > PERIOD_MAX_SAMPLES:
+        raise ValueError(f"Period of {freq} Hz is {num_samples} samples, more than PERIOD_MAX_SAMPLES")
+
+    if wave_type == SINE_WAVE:
+        t = np.arange(num_samples) / sample_rate
+        arr = (amp * np.sin(2.0 * np.pi * freq * t)).astype(np.int16)
+    elif wave_type == PULSE_WAVE:
+        arr = np.empty(num_samples, dtype=np.int16)
+        fill_pulse_wave(arr, amp, *get_pulse_samples(freq, duty_cycle, sample_rate))
+    else:
+        raise ValueError("Unknown wave_type: " + str(wave_type))
+
+    arr.setflags(write=False)
+    return arr
+
+
+def tile_wave(period_arr, num_samples=None, out=None, start=0):
+    """
+    Repeats a period wave (from get_period_wave()) until it is num_samples long, or until out is full.
+    If out has one column per channel (see new_sound_array()), every channel is written in the same pass.
+
+    :param period_arr: 1-D array, whole number of periods of a wave.
+    :param num_samples: an int, length of the returned array. Only used if out is None.
+    :param out: 1-D array, or 2-D array with one column per channel, filled in place.
+    :param start: an int, sample index of out[0] in the repeated wave (used when filling block by block).
+    :return: out (or a new 1-D array of num_samples values).
+    """
+    if out is None:
+        out = np.empty(num_samples, dtype=period_arr.dtype)
+
+    # Line up the period with the first sample of out
+    period_samples = len(period_arr)
+    offset = start % period_samples
+    if offset:
+        period_arr = np.roll(period_arr, -offset)
+
+    # Same value on every channel
+    if out.ndim == 2:
+        period_arr = period_arr[:, np.newaxis]
+
+    # View the whole periods of out as rows, then copy the period into every row (broadcast)
+    num_periods = len(out) // period_samples
+    num_body = num_periods * period_samples
+    out[:num_body].reshape(num_periods, period_samples, *out.shape[1:])[...] = period_arr
+
+    # Partial period at the end
+    out[num_body:] = period_arr[:len(out) - num_body]
+    return out
+
+
+class WaveWorkspace:
+    """
+    Reusable float32 work buffers for generating waves block by block with ufunc out= arguments,
+    so repeated generation (e.g. previews in the GUI) does not allocate large temporary arrays.
+    Only the int16 output array is allocated per call (by the caller).
+
+    The work buffers are block_size samples, no matter how long the generated wave is.
+    Note: Not thread safe, use one workspace per thread.
+    """
+
+    def __init__(self, block_size=BLOCK_SIZE_DEFAULT):
+        self.block_size = block_size
+        # Sample index within a block, used for every block
+        self.index = np.arange(block_size, dtype=np.float32)
+        # Work buffer, holds the phase, then the sine of the phase
+        self.work = np.empty(block_size, dtype=np.float32)
+
+    def fill_sine(self, out, amp=16000, freq=200, sample_rate=44100, phase=0.0):
+        """
+        Writes a sine wave into a preallocated int16 array (1-D, or 2-D with one column per channel).
+
+        :param out: int16 array, filled in place.
+        :param amp: Amplitude of sine wave. Max is 32000 (as per Tom).
+        :param freq: Hertz (Hz), Frequency of sine wave.
+        :param sample_rate: Hz, number of samples for a second.
+        :param phase: a float, radians, phase of out[0] (use the returned phase to continue a wave).
+        :return: a float, phase of the sample after the last one in out, wrapped to [0, 2*pi).
+        """
+        # Phase step per sample (radians)
+        phase_step = 2.0 * np.pi * freq / sample_rate
+
+        for pos in range(0, len(out), self.block_size):
+            num = min(self.block_size, len(out) - pos)
+            work = self.work[:num]
+
+            # work = amp * sin(phase + phase_step * index), without temporary arrays
+            np.multiply(self.index[:num], phase_step, out=work)
+            np.add(work, phase, out=work)
+            np.sin(work, out=work)
+            np.multiply(work, amp, out=work)
+
+            # Converts to 16 bit integers while writing into out
+            write_sound_array(out[pos:pos + num], work)
+
+            # Carry phase over to the next block, wrapped so it does not lose precision during long waves
+            phase = (phase + phase_step * num) % (2.0 * np.pi)
+
+        return phase
+
+
+def stream_sine_wave(amp=16000, freq=200, dur=1.0, sample_rate=44100, block_size=BLOCK_SIZE_DEFAULT,
+                     workspace=None):
+    """
+    Generator version of get_sine_wave(), yields the sine wave in int16 blocks of block_size samples
+    (the last block may be shorter), so memory stays at one block no matter how long dur is.
+
+    Uses a phase accumulator: the phase at the end of a block is carried over to the next block,
+    so the wave is continuous across block boundaries.
+    The phase is wrapped to [0, 2*pi) so it does not lose precision during long stimuli.
+
+    :param amp: Amplitude of sine wave. Max is 32000 (as per Tom). Default 16000.
+    :param freq: Hertz (Hz), Frequency of sine wave. Default 200.
+    :param dur: The duration of the signal. Default 1.0 seconds.
+    :param sample_rate: Hz, number of samples for a second. Default is 44100 Hz.
+    :param block_size: an int, number of samples per yielded block.
+    :param workspace: WaveWorkspace used for the calculations. A new one is made if None.
+    :return: generator of 1-D int16 arrays (mono blocks).
+    """
+    if workspace is None:
+        workspace = WaveWorkspace(block_size)
+
+    samples_left = get_num_samples(dur, sample_rate)
+    phase = 0.0
+
+    while samples_left > 0:
+        num = min(block_size, samples_left)
+        sine_block = np.empty(num, dtype=np.int16)
+        phase = workspace.fill_sine(sine_block, amp, freq, sample_rate, phase)
+        yield sine_block
+        samples_left -= num
+
+
+class DDSOscillator:
+    """
+    Direct digital synthesis (DDS) sine oscillator.
+
+    Holds a precomputed sine lookup table and steps a fixed-point (integer) phase accumulator per sample,
+    so no np.sin() is calculated per sample. The top DDS_TABLE_BITS of the phase pick the table entry.
+    Blocks are calculated with numpy (vectorized), and since the phase is an integer it is exact across blocks,
+    no matter how long the oscillator runs.
+
+    Frequency resolution is sample_rate / 2**64, so the frequency is exact for any practical run time.
+    The frequency (set_freq()) and amplitude (set_amp()) can be changed at any time,
+    the next sample continues from the current phase (no click).
+
+    Example:
+        osc = DDSOscillator(amp=16000, freq=50)
+        block = osc.render(4096)
+        osc.set_freq(60)
+        block2 = osc.render(4096)
+    """
+
+    def __init__(self, amp=16000, freq=200, sample_rate=44100, block_size=BLOCK_SIZE_DEFAULT,
+                 table_bits=DDS_TABLE_BITS):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.table_bits = table_bits
+        # Shift that turns a phase into a table index
+        self.index_shift = DDS_PHASE_BITS - table_bits
+
+        # Unit sine table, scaled to amp in set_amp()
+        self.unit_table = np.sin(2.0 * np.pi * np.arange(2 ** table_bits) / 2 ** table_bits)
+        self.table = None
+        self.amp = None
+        self.set_amp(amp)
+
+        self.phase = 0
+        self.phase_step = 0
+        self.freq = None
+        self.set_freq(freq)
+
+        # Reusable work buffers (uint64 wraps around, same as the phase accumulator)
+        self.steps = np.arange(block_size, dtype=np.uint64)
+        self.work = np.empty(block_size, dtype=np.uint64)
+
+    def set_amp(self, amp):
+        # Scale table to amp, so render() only needs a table lookup
+        self.amp = amp
+        self.table = (amp * self.unit_table).astype(np.int16)
+
+    def set_freq(self, freq):
+        # Phase step per sample, in units of 1 / 2**64 of a period
+        self.freq = freq
+        self.phase_step = get_dds_phase_step(freq, self.sample_rate)
+
+    def reset(self):
+        # Restart the wave at phase zero
+        self.phase = 0
+
+    def fill(self, out):
+        """
+        Writes the next len(out) samples into a preallocated 1-D int16 array.
+
+        :param out: 1-D int16 array, filled in place.
+        :return: out
+        """
+        for pos in range(0, len(out), self.block_size):
+            num = min(self.block_size, len(out) - pos)
+            work = self.work[:num]
+
+            # phase of each sample = phase + phase_step * n (mod 2**64), then table index = top bits of phase
+            np.multiply(self.steps[:num], np.uint64(self.phase_step), out=work)
+            np.add(work, np.uint64(self.phase), out=work)
+            np.right_shift(work, self.index_shift, out=work)
+            np.take(self.table, work, out=out[pos:pos + num])
+
+            self.phase = (self.phase + self.phase_step * num) % 2 ** DDS_PHASE_BITS
+
+        return out
+
+    def fill_freqs(self, out, freqs):
+        """
+        Writes the next len(out) samples into a preallocated 1-D int16 array,
+        with a different frequency for every sample (e.g. a chirp). The phase stays continuous.
+        Afterwards the oscillator keeps the last frequency.
+
+        :param out: 1-D int16 array, filled in place.
+        :param freqs: 1-D array of len(out) frequencies (Hz), one per sample.
+        :return: out
+        """
+        if len(out) == 0:
+            return out
+
+        # Phase step of every sample (the cumulative sum wraps around mod 2**64, same as the phase accumulator)
+        phase_steps = (np.asarray(freqs, dtype=np.float64) * (2 ** DDS_PHASE_BITS / self.sample_rate)).astype(np.uint64)
+        phases = np.cumsum(phase_steps, dtype=np.uint64)
+
+        # Sample n uses the phase before its own step: phase + steps[0] + ... + steps[n-1]
+        phases -= phase_steps
+        phases += np.uint64(self.phase)
+        np.right_shift(phases, self.index_shift, out=phases)
+        np.take(self.table, phases, out=out)
+
+        self.phase = (self.phase + int(phase_steps.sum(dtype=np.uint64))) % 2 ** DDS_PHASE_BITS
+        self.set_freq(freqs[-1])
+        return out
+
+    def render(self, num_samples):
+        # Returns the next num_samples samples as a new 1-D int16 array
+        return self.fill(np.empty(num_samples, dtype=np.int16))
+
+    def stream(self, dur=1.0):
+        """
+        Yields the next dur seconds of the wave in int16 blocks of block_size samples (the last block may be shorter).
+        Frequency and amplitude changes take effect at the next block.
+
+        :param dur: a float, unit: seconds.
+        :return: generator of 1-D int16 arrays (mono blocks).
+        """
+        samples_left = get_num_samples(dur, self.sample_rate)
+        while samples_left > 0:
+            num = min(self.block_size, samples_left)
+            yield self.render(num)
+            samples_left -= num
+
+
+def stream_chirp(amp=16000, start_freq=10, stop_freq=200, dur=10.0, sweep_type=SWEEP_LINEAR, sample_rate=44100,
+                 block_size=BLOCK_SIZE_DEFAULT):
+    """
+    Stream of a chirp: a sine wave whose frequency glides from start_freq to stop_freq over dur seconds,
+    with continuous phase (no clicks), generated with a DDSOscillator.
+    Only one block is held in memory, so a 10 minute sweep costs the same memory as a 1 second one.
+
+    :param amp: Amplitude of sine wave. Max is 32000 (as per Tom).
+    :param start_freq: Hertz (Hz), frequency at the start, above 0.
+    :param stop_freq: Hertz (Hz), frequency at the end, above 0.
+    :param dur: a float, unit: seconds.
+    :param sweep_type: SWEEP_LINEAR (same number of Hz per second)
+                       or SWEEP_LOG (same ratio per second, e.g. every octave takes as long).
+    :param sample_rate: Hz, number of samples for a second.
+    :param block_size: an int, number of samples per yielded block.
+    :return: generator of 1-D int16 arrays (mono blocks).
+    """
+    if sweep_type not in (SWEEP_LINEAR, SWEEP_LOG):
+        raise ValueError("Unknown sweep_type: " + str(sweep_type))
+    # A log sweep divides by start_freq, and neither end can be 0 Hz or below
+    if start_freq <= 0 or stop_freq <= 0:
+        raise ValueError(f"Sweep frequencies must be above 0 Hz, not {start_freq} to {stop_freq} Hz")
+
+    osc = DDSOscillator(amp, start_freq, sample_rate, block_size)
+    num_samples = get_num_samples(dur, sample_rate)
+
+    for pos in range(0, num_samples, block_size):
+        # Fraction of the sweep done at each sample of the block
+        sweep_done = np.arange(pos, min(pos + block_size, num_samples)) / num_samples
+
+        if sweep_type == SWEEP_LINEAR:
+            freqs = start_freq + (stop_freq - start_freq) * sweep_done
+        else:
+            freqs = start_freq * (stop_freq / start_freq) ** sweep_done
+
+        yield osc.fill_freqs(np.empty(len(freqs), dtype=np.int16), freqs)
+
+
+def get_sweep_freqs(start_freq=10, stop_freq=200, step_freq=10):
+    """
+    Gets the frequencies of a stepped sweep, same as range(start_freq, stop_freq, step_freq) in Tom's code,
+    but also works with floats.
+
+    :return: 1-D array of frequencies (Hz).
+    """
+    return np.arange(start_freq, stop_freq, step_freq)
+
+
+def stream_stepped_sweep(amp=16000, start_freq=10, stop_freq=200, step_freq=10, step_dur=1.0, sample_rate=44100,
+                         block_size=BLOCK_SIZE_DEFAULT):
+    """
+    Stream of a stepped sweep: a sine wave at every frequency of get_sweep_freqs() for step_dur seconds each.
+    Unlike building a new array per frequency, the phase is continuous from one step to the next (no clicks),
+    and only one block is held in memory.
+
+    :param amp: Amplitude of sine wave. Max is 32000 (as per Tom).
+    :param start_freq: Hertz (Hz), first frequency.
+    :param stop_freq: Hertz (Hz), not included (same as range()).
+    :param step_freq: Hertz (Hz), frequency step.
+    :param step_dur: a float, unit: seconds, how long each frequency is played.
+    :param sample_rate: Hz, number of samples for a second.
+    :param block_size: an int, number of samples per yielded block.
+    :return: generator of 1-D int16 arrays (mono blocks).
+    """
+    osc = DDSOscillator(amp, start_freq, sample_rate, block_size)
+
+    for freq in get_sweep_freqs(start_freq, stop_freq, step_freq):
+        osc.set_freq(freq)
+        yield from osc.stream(step_dur)
+
+
+def get_dds_phase_step(freq=200, sample_rate=44100):
+    """
+    Gets the DDS phase step per sample for freq, in units of 1 / 2**DDS_PHASE_BITS of a period.
+
+    :param freq: Hertz (Hz), frequency of the wave.
+    :param sample_rate: Hz, number of samples for a second.
+    :return: an int.
+    """
+    return int(round(float(freq) * 2.0 ** DDS_PHASE_BITS / sample_rate)) % 2 ** DDS_PHASE_BITS
+
+
+def get_pulse_samples(freq=200, duty_cycle=0.5, sample_rate=44100):
+    """
+    Converts a pulse frequency and duty cycle into integer sample counts for fill_pulse_wave().
+
+    If a period is not a whole number of samples (e.g. 200 Hz at 44100 Hz is 220.5 samples),
+    the smallest whole number of periods that is (see get_period_num_samples()) is used instead,
+    so the frequency is exact.
+
+    :param freq: Hertz (Hz), frequency of the pulse wave.
+    :param duty_cycle: a float, value from 0 to 1; no unit.
+    :param sample_rate: Hz, number of samples for a second.
+    :return: on_samples, period_samples, num_periods (ints), see fill_pulse_wave().
+    """
+    samples_per_period = Fraction(sample_rate) / Fraction(freq).limit_denominator(1000)
+    period_samples = samples_per_period.numerator
+    num_periods = samples_per_period.denominator
+
+    # Same rounding as scipy.signal.square: a sample is on while its phase is below the duty cycle
+    on_samples = math.ceil(duty_cycle * period_samples)
+    return on_samples, period_samples, num_periods
+
+
+@functools.lru_cache(maxsize=PERIOD_CACHE_SIZE)
+def get_pulse_cycle(amp, on_samples, period_samples, num_periods=1):
+    """
+    Generates (and caches) one cycle of period_samples samples for fill_pulse_wave().
+    Only integer math is used. The returned array is shared by the cache, so it is read-only.
+
+    :return: 1-D int16 array of period_samples values (amp when on, -amp when off).
+    """
+    if num_periods == 1:
+        cycle = np.full(period_samples, -amp, dtype=np.int16)
+        cycle[:on_samples] = amp
+    else:
+        # Sample n is on while its phase, (n * num_periods) mod period_samples, is below on_samples
+        phase = np.arange(period_samples, dtype=np.int64) * num_periods % period_samples
+        cycle = np.where(phase < on_samples, amp, -amp).astype(np.int16)
+
+    cycle.setflags(write=False)
+    return cycle
+
+
+def fill_pulse_wave(out, amp, on_samples, period_samples, num_periods=1, start=0):
+    """
+    Writes a pulse wave straight into a preallocated int16 buffer, using integer sample indices only
+    (no time array, no float temporaries, no SciPy).
+
+    num_periods pulses fit in period_samples samples, and each pulse is on for on_samples / num_periods samples.
+    Use get_pulse_samples() to get these from a frequency and duty cycle.
+    For example, 50 Hz with 25% duty cycle at 44100 Hz is on_samples=221, period_samples=882, num_periods=1.
+
+    :param out: 1-D int16 array, or 2-D with one column per channel (see new_sound_array()), filled in place.
+    :param amp: an int, value from 1 to 32,000 (max); no unit.
+    :param on_samples: an int, see above.
+    :param period_samples: an int, see above.
+    :param num_periods: an int, see above.
+    :param start: an int, sample index of out[0] in the pulse train (used when filling block by block).
+    :return: out
+    """
+    if period_samples > PERIOD_MAX_SAMPLES:
+        # Too long to cache (see PERIOD_MAX_SAMPLES), work out the phase of each sample a block at a time
+        for block_start in range(0, len(out), BLOCK_SIZE_DEFAULT):
+            block = out[block_start:block_start + BLOCK_SIZE_DEFAULT]
+            n = np.arange(start + block_start, start + block_start + len(block), dtype=np.int64)
+            values = np.where(n * num_periods % period_samples < on_samples, amp, -amp)
+            block[...] = values[:, np.newaxis] if block.ndim == 2 else values
+        return out
+
+    # Copy the integer cycle into every period of out (see tile_wave())
+    cycle = get_pulse_cycle(amp, on_samples, period_samples, num_periods)
+    return tile_wave(cycle, out=out, start=start)
+
+
+def get_pulse_train_segments(amp=16000, period=1000, pulse_width=500, pulse_count=200, sample_rate=44100):
+    """
+    Describes a train of pulse_count pulses as run-length segments (value, num_samples), lazily one pulse at a time,
+    so nothing of size period * pulse_count is ever allocated.
+    Each pulse is amp for pulse_width msec, then -amp for the rest of its period.
+
+    Pulse starts are rounded to the nearest sample from the start of the train (not from the previous pulse),
+    so a period that is not a whole number of samples does not drift over many pulses.
+
+    :param amp: an int, value from 1 to 32,000 (max); no unit.
+    :param period: unit: msec. How long the full period of a pulse is.
+    :param pulse_width: unit: msec. How long a pulse is on.
+    :param pulse_count: an int, number of pulses in the train.
+    :param sample_rate: Hz, number of samples for a second.
+    :return: generator of (value, num_samples) tuples.
+    """
+    # Period in samples as an exact fraction (e.g. 0.5 msec at 44100 Hz is 22.05 samples).
+    # Only the pulse starts are worked out from it, no period is ever stored, so it needs no PERIOD_MAX_SAMPLES cap.
+    period_samples = Fraction(period).limit_denominator(1000) * sample_rate / 1000
+    on_samples = min(get_num_samples(pulse_width / 1000, sample_rate), int(period_samples))
+
+    pulse_start = 0
+    for pulse_num in range(1, pulse_count + 1):
+        next_pulse_start = round(pulse_num * period_samples)
+        yield amp, on_samples
+        yield -amp, next_pulse_start - pulse_start - on_samples
+        pulse_start = next_pulse_start
+
+
+def stream_segments(segments, block_size=BLOCK_SIZE_DEFAULT):
+    """
+    Expands run-length segments (value, num_samples), e.g. from get_pulse_train_segments(),
+    into int16 blocks of block_size samples (the last block may be shorter).
+    Only one block is held in memory, no matter how long the segments are.
+
+    :param segments: iterable of (value, num_samples) tuples.
+    :param block_size: an int, number of samples per yielded block.
+    :return: generator of 1-D int16 arrays (mono blocks).
+    """
+    block = np.empty(block_size, dtype=np.int16)
+    block_pos = 0
+
+    for value, num_samples in segments:
+        while num_samples > 0:
+            num = min(num_samples, block_size - block_pos)
+            block[block_pos:block_pos + num] = value
+            block_pos += num
+            num_samples -= num
+
+            if block_pos == block_size:
+                # Yield a copy so the caller can keep it while the next block is filled
+                yield block.copy()
+                block_pos = 0
+
+    if block_pos:
+        yield block[:block_pos].copy()
+
+
+def stream_pulse_train(amp=16000, period=1000, pulse_width=500, pulse_count=200, sample_rate=44100,
+                       block_size=BLOCK_SIZE_DEFAULT):
+    """
+    Stream of a train of pulse_count pulses, see get_pulse_train_segments().
+    Memory stays at one block even for pulse_count=32,000 at long periods.
+
+    :return: generator of 1-D int16 arrays (mono blocks).
+    """
+    segments = get_pulse_train_segments(amp, period, pulse_width, pulse_count, sample_rate)
+    return stream_segments(segments, block_size)
+
+
 def get_pulse_wave(amp=16000, period=1000, pulse_width=500, pulse_count=200, dur=1.0, sample_rate=44100):
     """
     Generates 2 pulse_wave arrays, one for plotting, another for audio playback with PyGame.
@@ -108,10 +851,10 @@ def get_pulse_wave(amp=16000, period=1000, pulse_width=500, pulse_count=200, dur
                    Used in calculating duty cycle. How long the full period of a square wave is.
     :param pulse_width: an int, unit: msec (milliseconds). Used in calculating duty cycle and duration.
                         Determines how wide a pulse s, or how long it is on.
-    :param pulse_count: an int, unitless. Value from 1 to 32,000.
-                        For wave generation calculation, is treated like frequency.
-                        Used in calculating and duration.
-    :param dur: a float, unit: seconds. Determines time length of square wave.
+    :param pulse_count: an int, unitless. Value from 1 to 32,000. Number of pulses in the train.
+    :param dur: a float, unit: seconds. Determines time length of the returned arrays.
+                If the train is longer, only the first dur seconds are generated (use stream_pulse_train() for all of it).
+                If the train is shorter, silence is added to the end.
                 Note: Burst Period in play_audio determines how short or long playback actually is.
     :param sample_rate: Hz, number of samples for a second.
                         Default is 44100 Hz.
@@ -132,38 +875,29 @@ def get_pulse_wave(amp=16000, period=1000, pulse_width=500, pulse_count=200, dur
     # dur = (period / 1000) * pulse_count
     # print("dur:", dur)
     # Bug: don't do this! Creates a large array that crashed my computer if pulse count is high enough.
-
-    # Use sine's time array creation
-    ts = 1.0/sample_rate  # time step size
-    seconds_start = 0
-    seconds_end = dur
-    t = np.arange(seconds_start, seconds_end, ts)
-
-    # Calculate duty cycle
-    duty_cycle = pulse_width / period
-
-    # For purposes of calculations, pulse_count is playing role of frequency.
-    # Reasoning: I couldn't figure out how to make it work any other way and even scipy.signal uses frequency.
-    #            Bug: if using pulse count and period to create time array above,
-    #                 it creates a ridiculously long array that causes my computer to crash.
-    # Reasoning 2: Pulse Count appears to act similar to Frequency since I think "Frequency Counting" is related, maybe?
-    pulse_wave = amp * signal.square(2.0 * np.pi * pulse_count * t, duty=duty_cycle)
-
-    # Makes sure sound is 16 bit integers, as pygame.mixer is initialized to 16 bits.
-    # Refer to get_sine_wave() for more details
-    arr = pulse_wave.astype(np.int16)
-
-    # Create pygame.mixer compatible array
-    arr2 = np.c_[arr,arr]
-
-    # pulse_arr: for plotting (a vector)
-    # pulse_snd: square wave sound (snd) for audio playback in pygame (2 vectors, or stereo)
+    # Fixed: the train is described as on/off segments (get_pulse_train_segments()),
+    #        and only the first dur seconds of it are expanded into an array.
+    num_samples = get_num_samples(dur, sample_rate)
+    segments = get_pulse_train_segments(amp, period, pulse_width, pulse_count, sample_rate)
+
+    # Fill snd (all channels) segment by segment, stop once it is full (the rest stays silent)
+    arr, snd = new_sound_array(num_samples)
+    snd[...] = 0
+    arr_pos = 0
+    for value, seg_samples in segments:
+        if arr_pos >= num_samples:
+            break
+        snd[arr_pos:arr_pos + seg_samples] = value
+        arr_pos += seg_samples
+
+    # pulse_arr: for plotting (a vector, view of pulse_snd's first channel)
+    # pulse_snd: square wave sound (snd) for audio playback in pygame (one column per channel, or stereo)
     pulse_arr = arr
-    pulse_snd = arr2
+    pulse_snd = snd
     return pulse_arr, pulse_snd
 
 
-def get_pulse_wave2(amp=16000, freq=200, duty_cycle=0.5, dur=1.0, sample_rate=44100):
+def get_pulse_wave2(amp=16000, freq=200, duty_cycle=0.5, dur=1.0, sample_rate=44100, tile=False):
     """
     Generates 2 pulse_wave arrays, one for plotting, another for audio playback with PyGame.
 
@@ -179,14 +913,15 @@ def get_pulse_wave2(amp=16000, freq=200, duty_cycle=0.5, dur=1.0, sample_rate=44
                 Note: Burst Period in play_audio determines how short or long playback actually is.
     :param sample_rate: Hz, number of samples for a second.
                         Default is 44100 Hz.
+    :param tile: a bool, if True only one period is calculated (and cached), then repeated to dur.
     :return: pulse_arr (for plotting), pulse_snd (for audio playback in PyGame, might be stereo)
     """
 
-    # Use sine's time array creation
-    ts = 1.0/sample_rate  # time step size
-    seconds_start = 0
-    seconds_end = dur
-    t = np.arange(seconds_start, seconds_end, ts)
+    # Periods longer than PERIOD_MAX_SAMPLES are not cached, fill_pulse_wave() below generates them directly
+    if tile and is_period_cacheable(freq, sample_rate):
+        arr, snd = new_sound_array(get_num_samples(dur, sample_rate))
+        tile_wave(get_period_wave(PULSE_WAVE, amp, freq, duty_cycle, sample_rate), out=snd)
+        return arr, snd
 
     # Calculate duty cycle
     # duty_cycle = pulse_width / period
@@ -199,27 +934,22 @@ def get_pulse_wave2(amp=16000, freq=200, duty_cycle=0.5, dur=1.0, sample_rate=44
     # Print the results
 
     # For purposes of calculations, pulse_count is playing role of frequency.
-    # Reasoning: I couldn't figure out how to make it work any other way and even scipy.signal uses frequency.
+    # Reasoning: I couldn't figure out how to make it work any other way and even scipy.signal used frequency.
     #            Bug: if using pulse count and period to create time array above,
     #                 it creates a ridiculously long array that causes my computer to crash.
     # Reasoning 2: Pulse Count appears to act similar to Frequency since I think "Frequency Counting" is related, maybe?
-    pulse_wave = amp * signal.square(2.0 * np.pi * freq * t, duty=duty_cycle)
-
-    # Makes sure sound is 16 bit integers, as pygame.mixer is initialized to 16 bits.
-    # Refer to get_sine_wave() for more details
-    arr = pulse_wave.astype(np.int16)
-
-    # Create pygame.mixer compatible array
-    arr2 = np.c_[arr,arr]
+    # Write the int16 pulse wave straight into every channel of snd (see fill_pulse_wave())
+    arr, snd = new_sound_array(get_num_samples(dur, sample_rate))
+    fill_pulse_wave(snd, amp, *get_pulse_samples(freq, duty_cycle, sample_rate))
 
-    # pulse_arr: for plotting (a vector)
-    # pulse_snd: square wave sound (snd) for audio playback in pygame (2 vectors, or stereo)
+    # pulse_arr: for plotting (a vector, view of pulse_snd's first channel)
+    # pulse_snd: square wave sound (snd) for audio playback in pygame (one column per channel, or stereo)
     pulse_arr = arr
-    pulse_snd = arr2
+    pulse_snd = snd
     return pulse_arr, pulse_snd
 
 
-def get_pulse_wave3(amp=16000, period=200, duty_cycle=0.5, dur=1.0, sample_rate=44100):
+def get_pulse_wave3(amp=16000, period=200, duty_cycle=0.5, dur=1.0, sample_rate=44100, tile=False):
     """
     Generates 2 pulse_wave arrays, one for plotting, another for audio playback with PyGame.
 
@@ -236,14 +966,15 @@ def get_pulse_wave3(amp=16000, period=200, duty_cycle=0.5, dur=1.0, sample_rate=
                 Note: Burst Period in play_audio determines how short or long playback actually is.
     :param sample_rate: Hz, number of samples for a second.
                         Default is 44100 Hz.
+    :param tile: a bool, if True only one period is calculated (and cached), then repeated to dur.
     :return: pulse_arr (for plotting), pulse_snd (for audio playback in PyGame, might be stereo)
     """
 
-    # Use sine's time array creation
-    ts = 1.0/sample_rate  # time step size
-    seconds_start = 0
-    seconds_end = dur
-    t = np.arange(seconds_start, seconds_end, ts)
+    # Periods longer than PERIOD_MAX_SAMPLES are not cached, fill_pulse_wave() below generates them directly
+    if tile and is_period_cacheable(1000 / period, sample_rate):
+        arr, snd = new_sound_array(get_num_samples(dur, sample_rate))
+        tile_wave(get_period_wave(PULSE_WAVE, amp, 1000 / period, duty_cycle, sample_rate), out=snd)
+        return arr, snd
 
     # Calculate duty cycle
     # duty_cycle = pulse_width / period
@@ -258,98 +989,943 @@ def get_pulse_wave3(amp=16000, period=200, duty_cycle=0.5, dur=1.0, sample_rate=
     # Print the results
 
     # For purposes of calculations, pulse_count is playing role of frequency.
-    # Reasoning: I couldn't figure out how to make it work any other way and even scipy.signal uses frequency.
+    # Reasoning: I couldn't figure out how to make it work any other way and even scipy.signal used frequency.
     #            Bug: if using pulse count and period to create time array above,
     #                 it creates a ridiculously long array that causes my computer to crash.
     # Reasoning 2: Pulse Count appears to act similar to Frequency since I think "Frequency Counting" is related, maybe?
-    pulse_wave = amp * signal.square(2.0 * np.pi * t / period_sec, duty=duty_cycle)
-
-    # Makes sure sound is 16 bit integers, as pygame.mixer is initialized to 16 bits.
-    # Refer to get_sine_wave() for more details
-    arr = pulse_wave.astype(np.int16)
+    # Write the int16 pulse wave straight into every channel of snd (see fill_pulse_wave())
+    arr, snd = new_sound_array(get_num_samples(dur, sample_rate))
+    fill_pulse_wave(snd, amp, *get_pulse_samples(1000 / period, duty_cycle, sample_rate))
 
-    # Create pygame.mixer compatible array
-    arr2 = np.c_[arr,arr]
-
-    # pulse_arr: for plotting (a vector)
-    # pulse_snd: square wave sound (snd) for audio playback in pygame (2 vectors, or stereo)
+    # pulse_arr: for plotting (a vector, view of pulse_snd's first channel)
+    # pulse_snd: square wave sound (snd) for audio playback in pygame (one column per channel, or stereo)
     pulse_arr = arr
-    pulse_snd = arr2
+    pulse_snd = snd
     return pulse_arr, pulse_snd
 
 
+def get_wave_batch(wave_type=SINE_WAVE, amps=16000, freqs=200, duty_cycles=0.5, dur=1.0, sample_rate=44100):
+    """
+    Generates many sine or pulse waves of the same duration at once, e.g. all the steps of a frequency sweep,
+    in one broadcasted 2-D numpy calculation instead of one get_*_wave() call per wave.
+
+    amps, freqs and duty_cycles can be arrays (one value per wave) or single values (same for every wave).
+    Row i of the result is the wave with amps[i], freqs[i] and duty_cycles[i].
+
+    Note: The calculation is done in chunks of BLOCK_SIZE_DEFAULT samples (all waves at once),
+          so the temporaries stay small no matter how long dur is.
+          Pulse waves use the integer phase of fill_pulse_wave() (one set of sample counts per row),
+          so every row is the same as get_pulse_wave2() for its parameters.
+          Sine rows are calculated from the sample index instead of a time array,
+          so they can differ from get_sine_wave() by 1 (float rounding before the int16 conversion).
+
+    Example (frequency sweep of the shaker's range, 10 to 200 Hz in 10 Hz steps):
+        waves = get_wave_batch(SINE_WAVE, amps=16000, freqs=np.arange(10, 210, 10), dur=1.0)
+        play_audio(waves[0])
+
+    :param wave_type: SINE_WAVE or PULSE_WAVE.
+    :param amps: int or array of ints, value from 1 to 32,000 (max); no unit.
+    :param freqs: Hertz (Hz), number or array of numbers.
+    :param duty_cycles: float or array of floats, value from 0 to 1; no unit. Only used by PULSE_WAVE.
+    :param dur: a float, unit: seconds. Duration of every wave.
+    :param sample_rate: Hz, number of samples for a second.
+    :return: C-contiguous int16 array, shape (number of waves, number of samples).
+    """
+    if wave_type not in (SINE_WAVE, PULSE_WAVE):
+        raise ValueError("Unknown wave_type: " + str(wave_type))
+
+    # One column per wave parameter, so they broadcast against the sample index (one row per wave)
+    amps, freqs, duty_cycles = np.broadcast_arrays(np.atleast_1d(amps), np.atleast_1d(freqs),
+                                                   np.atleast_1d(duty_cycles))
+    amps = amps[:, np.newaxis]
+    cycles_per_sample = (freqs / sample_rate)[:, np.newaxis]
+
+    if wave_type == PULSE_WAVE:
+        # Integer sample counts of every row (see get_pulse_samples()), as columns
+        pulse_samples = np.array([get_pulse_samples(freq, duty_cycle, sample_rate)
+                                  for freq, duty_cycle in zip(freqs, duty_cycles)], dtype=np.int64).reshape(-1, 3)
+        on_samples, period_samples, num_periods = pulse_samples[:, 0:1], pulse_samples[:, 1:2], pulse_samples[:, 2:3]
+
+    num_samples = get_num_samples(dur, sample_rate)
+    waves = np.empty((len(freqs), num_samples), dtype=np.int16)
+
+    for pos in range(0, num_samples, BLOCK_SIZE_DEFAULT):
+        sample_index = np.arange(pos, min(pos + BLOCK_SIZE_DEFAULT, num_samples), dtype=np.int64)
+
+        if wave_type == SINE_WAVE:
+            # Number of periods since the start of the wave, for every wave and sample: amp * sin(2 * pi * freq * t)
+            cycles = cycles_per_sample * sample_index
+            waves[:, pos:pos + len(sample_index)] = amps * np.sin(2.0 * np.pi * cycles)
+        else:
+            # Same integer phase as fill_pulse_wave(): on while (n * num_periods) mod period_samples < on_samples
+            phase = sample_index * num_periods % period_samples
+            waves[:, pos:pos + len(sample_index)] = np.where(phase < on_samples, amps, -amps)
+
+    return waves
+
+
+class AudioEngine:
+    """
+    Owns pygame.mixer: initializes it once (start()), plays everything on one reserved Channel,
+    and shuts it down (stop()). This replaces calling pygame.mixer.init() on every playback.
+
+    Use the module's audio_engine (play_audio() and play_audio2() do), start it when the program starts
+    and stop it when the program ends. start() is also called on first playback if it was not called before.
+
+    Example:
+        audio_engine.start()
+        sound = audio_engine.make_sound(wave_snd)   # convert once
+        audio_engine.play(sound, playback_time=1000)  # per burst, only hands the Sound to the channel
+        audio_engine.stop()
+    """
+
+    def __init__(self, sampling_frequency=44100, size=-16, channels=1, buffer=512):
+        # Refer to pygame docs for more info about each variable:
+        # https://www.pygame.org/docs/ref/mixer.html#pygame.mixer.init
+        self.sampling_frequency = sampling_frequency
+        self.size = size
+        self.channels = channels
+        self.buffer = buffer
+        self.channel = None
+
+    def is_started(self):
+        return self.channel is not None and pygame.mixer.get_init() is not None
+
+    def start(self):
+        # Initialize pygame.mixer (only the first time) and reserve a channel for playback
+        if self.is_started():
+            return
+        pygame.mixer.init(self.sampling_frequency, self.size, self.channels, self.buffer,
+                          allowedchanges=MIXER_ALLOWED_CHANGES)
+        # Reserved channels are not picked by Sound.play() or find_channel(), so nothing else plays on it
+        pygame.mixer.set_reserved(1)
+        self.channel = pygame.mixer.Channel(0)
+
+    def stop(self):
+        # Stop playback and quit pygame.mixer
+        if self.channel is not None:
+            self.channel.stop()
+            self.channel = None
+        pygame.mixer.quit()
+
+    def get_time(self):
+        # Clock of the engine (seconds), the mixer plays in real time
+        return time.monotonic()
+
+    def make_sound(self, snd):
+        # Convert a sound array into a pygame Sound (copies the array), do this once per wave, not per burst
+        self.start()
+        return pygame.sndarray.make_sound(get_mixer_array(snd))
+
+    def play(self, snd, playback_time=1000, fade_in=0, fade_out=50):
+        """
+        Plays snd on the engine's channel for playback_time milliseconds, then starts the fade out.
+
+        :param snd: pygame Sound (from make_sound(), fastest), sound array, or stream of mono blocks.
+        :param playback_time: an int, unit: msec.
+        :param fade_in: an int, unit: msec. Rise time of sound.
+        :param fade_out: an int, unit: msec. Fall time of sound.
+        """
+        self.start()
+
+        if isinstance(snd, pygame.mixer.Sound):
+            sound = snd
+        elif isinstance(snd, np.ndarray):
+            sound = self.make_sound(snd)
+        else:
+            # snd is a stream of blocks (see stream_sine_wave())
+            play_stream(snd, playback_time=playback_time, fade_out=fade_out, channel=self.channel)
+            return
+
+        self.channel.play(sound, fade_ms=fade_in)
+        pygame.time.delay(playback_time)
+        self.channel.fadeout(fade_out)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+# Audio engine used by play_audio() and play_audio2(), see set_audio_backend()
+audio_engine = AudioEngine()
+
+
 def play_audio(snd, burst=1000):
     # burst, time in milliseconds
+    # snd can be a sound array, a pygame Sound (audio_engine.make_sound()), or a stream of blocks
     print("playing audio")
     fade_in=100     # rise time of sound time in milliseconds
-    duration=1000   # time in milliseconds
     fade_out=50     # fall time of sound time in milliseconds
 
-    # TODO: Decide where to initialize pygame.mixer (as global?)
-    #       Notes: only needs to be initialized once, can put in main.
-    # TODO: Figure out where to quit the mixer.
-    # TODO: Where to put the pygame init constants, at the beginning?
-    # Initialize pygame.mixer.init()
-    # Refer to pygame docs for more info about each variable:
-    # https://www.pygame.org/docs/ref/mixer.html#pygame.mixer.init
-    sampling_frequency = 44100
-    size = -16
-    channels = 1
-    buffer = 512
-    pygame.mixer.init(sampling_frequency, size, channels, buffer)
-    sound = pygame.sndarray.make_sound(snd)
-    sound.play(fade_ms=fade_in)
-    pygame.time.delay(burst)
-    sound.fadeout(fade_out)
+    # pygame.mixer is initialized once by audio_engine (see AudioEngine), not on every playback.
+    audio_engine.play(snd, playback_time=burst, fade_in=fade_in, fade_out=fade_out)
     pygame.time.wait(fade_out)
-    # pygame.mixer.quit()
     print("Done playing audio")
 
 
 def play_audio2(snd, playback_time=1000):
     # playback_time, time in milliseconds
+    # snd can be a sound array, a pygame Sound (audio_engine.make_sound()), or a stream of blocks
     print("play_audio2")
     print("playing audio")
 
-    fade_in=100     # rise time of sound time in milliseconds
-    duration=1000   # time in milliseconds
     fade_out=50     # fall time of sound time in milliseconds
 
-    # TODO: Decide where to initialize pygame.mixer (as global?)
-    #       Notes: only needs to be initialized once, can put in main.
-    # TODO: Figure out where to quit the mixer.
-    # TODO: Where to put the pygame init constants, at the beginning?
-    # Initialize pygame.mixer.init()
-    # Refer to pygame docs for more info about each variable:
-    # https://www.pygame.org/docs/ref/mixer.html#pygame.mixer.init
-    sampling_frequency = 44100
-    size = -16
-    channels = 1
-    buffer = 512
-    pygame.mixer.init(sampling_frequency, size, channels, buffer)
-    sound = pygame.sndarray.make_sound(snd)
-    sound.play()
-    pygame.time.delay(playback_time)
-
+    # pygame.mixer is initialized once by audio_engine (see AudioEngine), not on every playback.
     # Fade Out seems to lowers chance for bug where short wave samples play over each other,
     # causing an increase in volume (probably amplitude since it is constructive interference)
-    sound.fadeout(fade_out)
+    audio_engine.play(snd, playback_time=playback_time, fade_out=fade_out)
 
     print("Done playing audio")
 
 
+def play_looped(period_arr, playback_time=1000, fade_out=50):
+    """
+    Plays a period wave (from get_period_wave()) as a looped Sound for playback_time milliseconds
+    on the audio_engine's channel.
+    Only the period is held in memory, no matter how long playback_time is.
+
+    :param period_arr: 1-D int16 array, whole number of periods of a wave.
+    :param playback_time: an int, unit: msec.
+    :param fade_out: an int, unit: msec. Fall time of sound at the end of playback.
+    """
+    sound = audio_engine.make_sound(period_arr)
+    # loops=-1 repeats the sound until it is stopped
+    audio_engine.channel.play(sound, loops=-1)
+    pygame.time.delay(playback_time)
+    audio_engine.channel.fadeout(fade_out)
+
+
+def get_mixer_array(block):
+    """
+    Converts a mono block, or a sound array (from new_sound_array()),
+    into the layout pygame.mixer was actually initialized with.
+    pygame may open the audio device in stereo even when pygame.mixer.init() asks for 1 channel,
+    in which case make_sound() needs one column per channel.
+    Nothing is copied if the layout already matches.
+
+    :param block: 1-D int16 array (mono), or 2-D with one column per channel.
+    :return: int16 array accepted by pygame.sndarray.make_sound().
+    """
+    mixer_channels = pygame.mixer.get_init()[2]
+    if block.ndim == 2:
+        if block.shape[1] == mixer_channels:
+            return block
+        # All channels hold the same wave, use the first one (make_sound() needs a contiguous array)
+        block = np.ascontiguousarray(block[:, 0])
+
+    if mixer_channels == 1:
+        return block
+    return np.repeat(block[:, np.newaxis], mixer_channels, axis=1)
+
+
+class BurstPlayer:
+    """
+    Plays bursts and silences back to back on the audio_engine's reserved channel, gapless and sample accurate.
+
+    The next burst (or silence) is queued on the channel (Channel.queue()) while the current one is still playing,
+    so the mixer starts it on the very next sample, instead of relying on pygame.time.delay() and fadeout().
+    Bursts are cut to their exact number of samples, with a short fade out inside the burst (no click).
+
+    Two bursts never overlap: everything is played on one channel, and a channel plays one Sound at a time.
+
+    Silences are queued as repeats of one short Sound of zeros (SILENCE_BLOCK_MS), so a long silence costs no memory.
+
+    Every wait is a wait on stop_event (threading.Event), so cancel() (or setting stop_event from any thread,
+    e.g. the GUI's Stop button) ends it right away, and no CPU is used while waiting.
+
+    With a BlockEngine (stream, null or WAV file backend, see set_audio_backend()) the bursts and silences
+    are written block by block with BlockEngine.write() instead, with the same samples and fade out.
+
+    Example (burst of 1 sec, then 4 sec of silence, forever until stop_event is set):
+        player = BurstPlayer(stop_event=stop_event)
+        while player.queue_burst(wave_snd, 1000) and player.queue_silence(4000):
+            pass
+        player.stop()
+    """
+
+    # Length of the Sound of zeros used for silences (msec)
+    SILENCE_BLOCK_MS = 1000
+    # How often the channel is checked while waiting for it (msec), must be much shorter than any burst
+    POLL_MS = 5
+
+    def __init__(self, engine=None, sample_rate=44100, fade_out=50, stop_event=None):
+        self.engine = audio_engine if engine is None else engine
+        self.sample_rate = sample_rate
+        self.fade_out = fade_out
+        # Set to stop every wait (see cancel())
+        self.stop_event = threading.Event() if stop_event is None else stop_event
+
+        # Sound of the last burst, reused while the same wave and burst length are played.
+        # The wave itself is kept (compared with "is"), an id() could be reused by a new array once the old one is freed.
+        self.burst_wave = None
+        self.burst_num_samples = None
+        self.burst_sound = None
+        # Sound of zeros of SILENCE_BLOCK_MS, made once (see get_silence_sound())
+        self.silence_sound = None
+        # Engine clock time (seconds) when everything queued on the channel has played, see get_time()
+        self.end_time = None
+
+    def cancel(self):
+        # Ends the current wait right away (can be called from any thread), the queue functions then return False
+        self.stop_event.set()
+
+    def get_num_samples(self, playback_time):
+        # Number of samples for playback_time milliseconds
+        return get_num_samples(playback_time / 1000, self.sample_rate)
+
+    def get_burst_sound(self, wave_snd, num_samples):
+        # Sound of the first num_samples of wave_snd with a fade out at the end, made once per wave and length
+        if wave_snd is not self.burst_wave or num_samples != self.burst_num_samples:
+            burst_snd = np.array(wave_snd[:num_samples])
+            apply_fade_out(burst_snd, self.get_num_samples(self.fade_out))
+            self.burst_sound = self.engine.make_sound(burst_snd)
+            self.burst_wave = wave_snd
+            self.burst_num_samples = num_samples
+        return self.burst_sound
+
+    def get_silence_sound(self, num_samples):
+        # Sound of num_samples zeros. Only the SILENCE_BLOCK_MS Sound is kept: the piece left over after
+        # the full blocks is a different length almost every burst (silences end at deadlines), so it is made every time
+        if num_samples != self.get_num_samples(self.SILENCE_BLOCK_MS):
+            return self.engine.make_sound(np.zeros(num_samples, dtype=np.int16))
+        if self.silence_sound is None:
+            self.silence_sound = self.engine.make_sound(np.zeros(num_samples, dtype=np.int16))
+        return self.silence_sound
+
+    def queue(self, sound):
+        """
+        Plays sound right after the sound that is currently playing (or now, if nothing is playing).
+        Waits until the channel's queue is free, Channel.queue() only holds one sound.
+
+        :param sound: pygame Sound.
+        :return: False if stop_event was set (sound was not queued), else True.
+        """
+        self.engine.start()
+        channel = self.engine.channel
+
+        while channel.get_queue() is not None:
+            if self.stop_event.wait(self.POLL_MS / 1000):
+                return False
+        if self.stop_event.is_set():
+            return False
+
+        # The sound starts when the sounds before it have played (or now), see get_time()
+        self.end_time = self.get_time() + sound.get_length()
+        if channel.get_busy():
+            channel.queue(sound)
+        else:
+            channel.play(sound)
+        return True
+
+    def queue_burst(self, snd, playback_time=1000):
+        """
+        Queues playback_time milliseconds of snd (see queue()).
+
+        :param snd: sound array (the Sound is made once and reused for the next bursts),
+                    or a stream of mono blocks (e.g. stream_sine_wave(), a new stream every burst).
+        :param playback_time: an int, unit: msec. Length of the burst. Nothing is queued if it is 0 samples.
+        :return: see queue().
+        """
+        num_samples = self.get_num_samples(playback_time)
+        # A Sound of 0 samples crashes the mixer (segmentation fault), so an empty burst is not queued at all
+        if num_samples <= 0:
+            return not self.stop_event.is_set()
+
+        if isinstance(self.engine, BlockEngine):
+            burst = stream_burst(self.engine.get_stream(snd), num_samples,
+                                 fade_out_samples=self.get_num_samples(self.fade_out))
+            return self.write(burst)
+
+        if isinstance(snd, np.ndarray):
+            if len(snd) == 0:
+                return not self.stop_event.is_set()
+            return self.queue(self.get_burst_sound(snd, num_samples))
+
+        # Stream: queue block by block, cut at num_samples (empty blocks are skipped, see above)
+        for block in snd:
+            if num_samples <= 0:
+                break
+            if len(block) == 0:
+                continue
+            block = np.array(block[:num_samples])
+            num_samples -= len(block)
+            if num_samples <= 0:
+                apply_fade_out(block, self.get_num_samples(self.fade_out))
+            if not self.queue(self.engine.make_sound(block)):
+                return False
+        return True
+
+    def queue_silence(self, silence_time=1000):
+        """
+        Queues silence_time milliseconds of silence (see queue()), in pieces of SILENCE_BLOCK_MS.
+
+        :param silence_time: a number, unit: msec. Nothing is queued if 0 or less.
+        :return: see queue().
+        """
+        num_samples = self.get_num_samples(max(silence_time, 0))
+        block_samples = self.get_num_samples(self.SILENCE_BLOCK_MS)
+
+        if isinstance(self.engine, BlockEngine):
+            # Short blocks, so stop_event is checked often
+            block_samples = self.engine.block_size
+            silence = np.zeros(block_samples, dtype=np.int16)
+            blocks = (silence[:min(block_samples, num_samples - pos)] for pos in range(0, num_samples, block_samples))
+            return self.write(blocks)
+
+        while num_samples > 0:
+            num = min(num_samples, block_samples)
+            if not self.queue(self.get_silence_sound(num)):
+                return False
+            num_samples -= num
+        return True
+
+    def get_time(self):
+        """
+        Clock of the player (seconds): when the next queued (or written) sound starts playing,
+        e.g. the clock of a BurstScheduler.
+        With a BlockEngine this is the engine's clock (get_time()).
+        On the channel it is the end of everything queued so far, or now if the channel has run out,
+        so a burst queued right after a silence is on time even though it is queued ahead.
+        Lateness measured on this clock (BurstScheduler) is therefore 0 unless the channel ran out of sound
+        before the burst, the mixer's own output latency is not included.
+
+        :return: a float, unit: seconds, only differences mean something (like time.monotonic()).
+        """
+        current_time = self.engine.get_time()
+        if isinstance(self.engine, BlockEngine) or self.end_time is None:
+            return current_time
+        return max(self.end_time, current_time)
+
+    def wait_until(self, deadline):
+        """
+        Queues silence until the player's clock (get_time()) reaches deadline, e.g. the next burst's deadline
+        from a BurstScheduler. The length of the silence comes from the absolute deadline,
+        and the silence is queued like any other sound (see queue_silence()), so the next burst queued after it
+        starts on the exact sample, no sleep in between. With a BlockEngine the silence is written
+        (so it is in a WAV file, and the null and WAV file backends keep their own speed).
+
+        :param deadline: a float, unit: seconds, on the player's clock.
+        :return: see queue().
+        """
+        return self.queue_silence((deadline - self.get_time()) * 1000)
+
+    def write(self, blocks):
+        # Writes blocks with BlockEngine.write(), returns False if stop_event was set (checked every block)
+        for block in blocks:
+            if self.stop_event.is_set():
+                return False
+            self.engine.write(block)
+        return True
+
+    def wait_done(self):
+        # Waits until everything queued has played, returns False if stop_event was set
+        if isinstance(self.engine, BlockEngine):
+            self.engine.wait_done()
+            return True
+
+        channel = self.engine.channel
+        while channel is not None and channel.get_busy():
+            if self.stop_event.wait(self.POLL_MS / 1000):
+                return False
+        return True
+
+    def stop(self):
+        # Fades out what is playing and drops what is queued (BlockEngine: what is written has already been handed over)
+        if isinstance(self.engine, BlockEngine):
+            return
+
+        channel = self.engine.channel
+        if channel is not None:
+            channel.fadeout(self.fade_out)
+        self.end_time = None
+
+
+def apply_fade_out(snd, fade_samples):
+    """
+    Fades the end of snd (in place) linearly down to zero over fade_samples samples.
+
+    :param snd: int16 sound array (1-D, or 2-D with one column per channel).
+    :param fade_samples: an int, number of samples of the fade.
+    """
+    fade_samples = min(fade_samples, len(snd))
+    if fade_samples <= 0:
+        return
+
+    fade = np.linspace(1.0, 0.0, fade_samples)
+    if snd.ndim == 2:
+        fade = fade[:, np.newaxis]
+    snd[-fade_samples:] = snd[-fade_samples:] * fade
+
+
+def play_stream(stream, playback_time=1000, fade_out=50, channel=None):
+    """
+    Plays a stream of mono blocks (e.g. from stream_sine_wave()) for playback_time milliseconds.
+    Only the playing block and the queued block are held in memory.
+    pygame.mixer must already be initialized.
+
+    :param stream: iterable of 1-D int16 arrays.
+    :param playback_time: an int, unit: msec. Playback stops early if the stream runs out.
+    :param fade_out: an int, unit: msec. Fall time of sound at the end of playback.
+    :param channel: pygame Channel to play on, a free channel is used if None.
+    """
+    if channel is None:
+        channel = pygame.mixer.find_channel(True)
+    end_time = pygame.time.get_ticks() + playback_time
+
+    for block in stream:
+        sound = pygame.sndarray.make_sound(get_mixer_array(block))
+
+        if not channel.get_busy():
+            channel.play(sound)
+        else:
+            # Channel.queue() only holds one sound, wait for the queued block to start playing
+            while channel.get_queue() is not None and pygame.time.get_ticks() < end_time:
+                pygame.time.wait(1)
+            channel.queue(sound)
+
+        if pygame.time.get_ticks() >= end_time:
+            break
+
+    # Wait out the rest of the playback time (or the last queued blocks)
+    while channel.get_busy() and pygame.time.get_ticks() < end_time:
+        pygame.time.wait(1)
+
+    channel.fadeout(fade_out)
+
+
+class RingBuffer:
+    """
+    Single producer, single consumer ring buffer of int16 samples, without locks.
+
+    The producer (write()) only ever moves write_pos, the consumer (read(), e.g. the audio callback) only moves read_pos.
+    Both positions only count up (they are never wrapped, data index is position % capacity),
+    and each side updates its position after copying the samples, so the other side never sees half copied samples.
+    The audio callback never waits on a lock held by the producer.
+    """
+
+    def __init__(self, capacity=STREAM_CALLBACK_SAMPLES * STREAM_BUFFER_BLOCKS):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=np.int16)
+        self.write_pos = 0
+        self.read_pos = 0
+
+    def get_num_available(self):
+        # Number of samples written but not read yet
+        return self.write_pos - self.read_pos
+
+    def get_num_free(self):
+        return self.capacity - self.get_num_available()
+
+    def write(self, block):
+        """
+        Copies as much of block as fits into the buffer.
+
+        :param block: 1-D int16 array.
+        :return: an int, number of samples written (0 if the buffer is full).
+        """
+        num = min(len(block), self.get_num_free())
+        start = self.write_pos % self.capacity
+        first = min(num, self.capacity - start)
+        self.data[start:start + first] = block[:first]
+        self.data[:num - first] = block[first:num]
+        self.write_pos += num
+        return num
+
+    def read(self, out):
+        """
+        Fills out with the oldest samples of the buffer, zeros where there are not enough samples (underrun).
+
+        :param out: 1-D int16 array.
+        :return: an int, number of samples read (less than len(out) on underrun).
+        """
+        num = min(len(out), self.get_num_available())
+        start = self.read_pos % self.capacity
+        first = min(num, self.capacity - start)
+        out[:first] = self.data[start:start + first]
+        out[first:num] = self.data[:num - first]
+        out[num:] = 0
+        self.read_pos += num
+        return num
+
+
+class BlockEngine:
+    """
+    Base of the audio engines that are fed blocks of samples with write(): StreamEngine, NullEngine and WavFileEngine.
+    Same interface as AudioEngine (start(), stop(), make_sound(), play()), so play_audio() and play_audio2() work
+    with any of them (see set_audio_backend()). BurstPlayer writes its bursts and silences with write().
+
+    Subclasses implement start(), stop(), write() and get_time().
+    """
+
+    def __init__(self, sampling_frequency=44100, block_size=STREAM_CALLBACK_SAMPLES):
+        self.sampling_frequency = sampling_frequency
+        # Sound arrays are written in blocks of block_size samples
+        self.block_size = block_size
+
+    def is_started(self):
+        return False
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def write(self, block):
+        # Plays (or stores) block right after the samples written before it
+        raise NotImplementedError
+
+    def wait_done(self):
+        # Waits until everything written has played
+        pass
+
+    def get_time(self):
+        # Clock of the engine (seconds), only differences mean something (like time.monotonic())
+        return time.monotonic()
+
+    def make_sound(self, snd):
+        # Nothing to convert, the samples are copied by write()
+        if snd.ndim == 2:
+            return snd[:, 0]
+        return snd
+
+    def get_stream(self, snd):
+        # Stream of blocks of snd (a sound array or already a stream), views of the array, nothing is copied
+        if isinstance(snd, np.ndarray):
+            snd = self.make_sound(snd)
+            return (snd[pos:pos + self.block_size] for pos in range(0, len(snd), self.block_size))
+        return snd
+
+    def play(self, snd, playback_time=1000, fade_in=0, fade_out=50):
+        """
+        Plays playback_time milliseconds of snd, with the fades inside the playback time. Returns when it has played.
+
+        :param snd: sound array, or stream of mono blocks. Playback stops early if the stream runs out.
+        :param playback_time: an int, unit: msec.
+        :param fade_in: an int, unit: msec. Rise time of sound.
+        :param fade_out: an int, unit: msec. Fall time of sound.
+        """
+        self.start()
+
+        num_samples = get_num_samples(playback_time / 1000, self.sampling_frequency)
+        fade_in_samples = get_num_samples(fade_in / 1000, self.sampling_frequency)
+        fade_out_samples = get_num_samples(fade_out / 1000, self.sampling_frequency)
+
+        for block in stream_burst(self.get_stream(snd), num_samples, fade_in_samples, fade_out_samples):
+            self.write(block)
+        self.wait_done()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class StreamEngine(BlockEngine):
+    """
+    Pull-based audio backend: the audio device calls back (from SDL's audio thread) every callback_samples,
+    and the callback copies the samples out of a RingBuffer.
+    play() pulls blocks from a stream (e.g. DDSOscillator.stream(), stream_chirp()) and writes them into the ring buffer,
+    so only the ring buffer is held in memory, no matter how long the stimulus is (multi hour stimuli are fine).
+
+    A change to the stream's source (e.g. DDSOscillator.set_freq()) is heard once the blocks
+    already in the ring buffer have played, so use a block_size of about callback_samples for the stream.
+
+    Select it with set_audio_backend(AUDIO_BACKEND_STREAM) and play_audio2() uses it.
+
+    Example:
+        osc = DDSOscillator(amp=16000, freq=50, block_size=STREAM_CALLBACK_SAMPLES)
+        with StreamEngine() as engine:
+            engine.play(osc.stream(3 * 60 * 60), playback_time=3 * 60 * 60 * 1000)
+    """
+
+    def __init__(self, sampling_frequency=44100, callback_samples=STREAM_CALLBACK_SAMPLES,
+                 buffer_blocks=STREAM_BUFFER_BLOCKS):
+        super().__init__(sampling_frequency, callback_samples)
+        self.callback_samples = callback_samples
+        self.ring_buffer = RingBuffer(callback_samples * buffer_blocks)
+        self.device = None
+        # Number of callbacks that did not get enough samples (played zeros instead) while samples were being written
+        self.underruns = 0
+        # True from write() until wait_done(), the ring buffer running empty in between is an underrun
+        self.is_writing = False
+        # Number of zeros the callback played because the ring buffer was empty (underruns and idle time),
+        # the device has played ring_buffer.read_pos + num_gap_samples samples since start() (see get_time())
+        self.num_gap_samples = 0
+        # Time the producer sleeps when the ring buffer is full, half a callback (seconds)
+        self.wait_time = callback_samples / sampling_frequency / 2
+
+    def is_started(self):
+        return self.device is not None
+
+    def start(self):
+        # Open the audio device (only the first time) and start the callbacks
+        if self.is_started():
+            return
+        # Same audio device as pygame.mixer, so stop the mixer backend first (see set_audio_backend())
+        # Only imported when the streamed backend is used
+        import pygame._sdl2.audio
+
+        pygame._sdl2.init_subsystem(pygame._sdl2.INIT_AUDIO)
+        device_name = pygame._sdl2.audio.get_audio_device_names(False)[0]
+        self.device = pygame._sdl2.audio.AudioDevice(
+            devicename=device_name, iscapture=False, frequency=self.sampling_frequency,
+            audioformat=pygame._sdl2.audio.AUDIO_S16, numchannels=1, chunksize=self.callback_samples,
+            allowed_changes=0, callback=self.callback)
+        self.num_gap_samples = 0
+        self.ring_buffer.read_pos = self.ring_buffer.write_pos = 0
+        self.device.pause(0)
+
+    def stop(self):
+        # Close the audio device, drops what is left in the ring buffer
+        if self.device is not None:
+            self.device.pause(1)
+            self.device.close()
+            self.device = None
+        self.ring_buffer.read_pos = self.ring_buffer.write_pos
+        # Quits SDL's audio subsystem, so pygame.mixer can be initialized again
+        pygame.mixer.quit()
+
+    def callback(self, device, stream):
+        # Called from SDL's audio thread, stream is the device buffer (bytes) to fill
+        out = np.asarray(stream).view(np.int16)
+        num_gap = len(out) - self.ring_buffer.read(out)
+        if num_gap > 0:
+            self.num_gap_samples += num_gap
+            if self.is_writing:
+                self.underruns += 1
+
+    def write(self, block):
+        # Writes block into the ring buffer, waits while the ring buffer is full.
+        # Used by play() and BurstPlayer, so underruns are counted on every write until wait_done()
+        self.start()
+        pos = 0
+        while pos < len(block):
+            num = self.ring_buffer.write(block[pos:])
+            pos += num
+            if num == 0:
+                time.sleep(self.wait_time)
+        self.is_writing = True
+
+    def wait_done(self):
+        # Waits until everything written has played, the ring buffer running empty is no longer an underrun
+        self.is_writing = False
+        while self.ring_buffer.get_num_available() > 0:
+            time.sleep(self.wait_time)
+
+    def get_time(self):
+        # Audio clock (seconds): when the next written sample will play, counted in samples of the device.
+        # Samples the callback has played (zeros included) plus the samples still waiting in the ring buffer,
+        # so the latency of the ring buffer is included, and time goes on (zeros) while nothing is written.
+        return (self.ring_buffer.write_pos + self.num_gap_samples) / self.sampling_frequency
+
+
+class NullEngine(BlockEngine):
+    """
+    Output sink that plays nothing, for running the experiment (and benchmarks) on a machine without audio hardware.
+
+    Samples are consumed at real time (speed=1.0), faster (e.g. speed=60.0 runs 1 minute of audio per second),
+    or as fast as they are written (speed=None).
+    write() returns when the samples written before the block would have finished playing,
+    like Channel.queue() returns when the queued sound starts.
+
+    get_time() is the audio clock (seconds of audio written), so an experiment timed with it
+    runs for the same amount of audio no matter the speed.
+    """
+
+    # If nothing was written for this long after the samples ran out (seconds), the sink was idle,
+    # and the next block plays from now. Shorter delays (e.g. oversleeping) are caught up, so they do not add up.
+    IDLE_TIME = 0.1
+
+    def __init__(self, sampling_frequency=44100, speed=1.0):
+        super().__init__(sampling_frequency)
+        self.speed = speed
+        # Number of samples written since start()
+        self.num_samples = 0
+        # time.monotonic() when the samples written so far have been "played" (speed is not None)
+        self.end_time = None
+
+    def is_started(self):
+        return self.end_time is not None
+
+    def start(self):
+        if self.is_started():
+            return
+        self.num_samples = 0
+        self.end_time = time.monotonic()
+
+    def stop(self):
+        self.end_time = None
+
+    def wait_until(self, deadline):
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def write(self, block):
+        self.start()
+        if self.speed is not None:
+            # Wait for the previous samples, then this block plays from end_time (or from now, after an idle gap)
+            self.wait_until(self.end_time)
+            current_time = time.monotonic()
+            if current_time - self.end_time > self.IDLE_TIME:
+                self.end_time = current_time
+            self.end_time += len(block) / self.sampling_frequency / self.speed
+        self.num_samples += len(block)
+
+    def wait_done(self):
+        if self.speed is not None and self.end_time is not None:
+            self.wait_until(self.end_time)
+
+    def get_time(self):
+        return self.num_samples / self.sampling_frequency
+
+
+class WavFileEngine(NullEngine):
+    """
+    Output sink that writes exactly the samples that would have been played into a WAV file
+    (mono, 16 bit, sampling_frequency), e.g. to check an experiment sample for sample.
+    The file is written block by block, so memory does not grow with the length of the experiment.
+
+    Runs as fast as possible by default (speed=None), see NullEngine for speed and get_time().
+    The file is closed by stop().
+
+    Example:
+        with WavFileEngine("experiment.wav") as engine:
+            engine.play(sine_snd, playback_time=1000)
+    """
+
+    def __init__(self, path=WAV_FILE_DEFAULT, sampling_frequency=44100, speed=None):
+        super().__init__(sampling_frequency, speed)
+        self.path = path
+        self.wav_file = None
+
+    def start(self):
+        if self.is_started():
+            return
+        super().start()
+        self.wav_file = wave.open(self.path, "wb")
+        self.wav_file.setnchannels(1)
+        self.wav_file.setsampwidth(2)
+        self.wav_file.setframerate(self.sampling_frequency)
+
+    def stop(self):
+        if self.wav_file is not None:
+            self.wav_file.close()
+            self.wav_file = None
+        super().stop()
+
+    def write(self, block):
+        super().write(block)
+        # WAV samples are little endian
+        self.wav_file.writeframes(block.astype("<i2", copy=False).tobytes())
+
+
+def stream_burst(stream, num_samples, fade_in_samples=0, fade_out_samples=0):
+    """
+    Cuts a stream of mono blocks to num_samples samples, with linear fades at the start and end.
+    Only blocks inside a fade are copied.
+
+    :param stream: iterable of 1-D int16 arrays.
+    :param num_samples: an int, number of samples of the burst. Shorter if the stream runs out.
+    :param fade_in_samples: an int, number of samples of the fade in.
+    :param fade_out_samples: an int, number of samples of the fade out.
+    :return: generator of 1-D int16 arrays (mono blocks).
+    """
+    pos = 0
+    for block in stream:
+        if pos >= num_samples:
+            break
+        block = block[:num_samples - pos]
+        end = pos + len(block)
+
+        if pos < fade_in_samples or end > num_samples - fade_out_samples:
+            # Gain of every sample of the block, 1.0 outside the fades
+            sample_index = np.arange(pos, end)
+            gain = np.ones(len(block))
+            if fade_in_samples > 0:
+                gain = np.minimum(gain, sample_index / fade_in_samples)
+            if fade_out_samples > 0:
+                # Same fade as apply_fade_out(), from 1.0 down to 0.0 at the last sample
+                gain = np.minimum(gain, (num_samples - 1 - sample_index) / max(fade_out_samples - 1, 1))
+            block = (block * gain).astype(np.int16)
+
+        yield block
+        pos = end
+
+
+def set_audio_backend(backend=AUDIO_BACKEND_MIXER, **engine_kwargs):
+    """
+    Selects the engine used by play_audio(), play_audio2() and BurstPlayer (the module's audio_engine).
+    The current engine is stopped if the backend changes (or engine_kwargs are given),
+    the new one is started on first playback.
+
+    Example (run without audio hardware, record everything into a WAV file):
+        set_audio_backend(AUDIO_BACKEND_WAV, path="experiment.wav")
+
+    :param backend: AUDIO_BACKEND_MIXER (AudioEngine), AUDIO_BACKEND_STREAM (StreamEngine),
+                    AUDIO_BACKEND_NULL (NullEngine) or AUDIO_BACKEND_WAV (WavFileEngine).
+    :param engine_kwargs: passed to the engine class, e.g. path or speed.
+    :return: the audio engine.
+    """
+    global audio_engine
+
+    engine_class = AUDIO_ENGINES[backend]
+    if type(audio_engine) is not engine_class or engine_kwargs:
+        audio_engine.stop()
+        audio_engine = engine_class(**engine_kwargs)
+    return audio_engine
+
+
+# Audio engine class of each audio backend, see set_audio_backend()
+AUDIO_ENGINES = {
+    AUDIO_BACKEND_MIXER: AudioEngine,
+    AUDIO_BACKEND_STREAM: StreamEngine,
+    AUDIO_BACKEND_NULL: NullEngine,
+    AUDIO_BACKEND_WAV: WavFileEngine,
+}
+
+
+def get_min_max_columns(wave_arr, num_columns):
+    """
+    Decimates a wave for drawing: the smallest and largest sample of every column (pixel),
+    so a wave of any duration is drawn with num_columns vertical lines and no peak is lost.
+    Calculated with numpy (reduceat), no Python loop over the samples.
+
+    :param wave_arr: 1-D numpy array, the wave.
+    :param num_columns: an int, number of columns (e.g. width of the graph in pixels).
+                        Fewer columns are returned if the wave has fewer samples.
+    :return: mins, maxs (numpy arrays, one value per column).
+    """
+    num_columns = min(num_columns, len(wave_arr))
+    if num_columns == 0:
+        return np.zeros(0, dtype=wave_arr.dtype), np.zeros(0, dtype=wave_arr.dtype)
+
+    # First sample of every column, columns differ by at most one sample
+    column_starts = np.arange(num_columns) * len(wave_arr) // num_columns
+    return np.minimum.reduceat(wave_arr, column_starts), np.maximum.reduceat(wave_arr, column_starts)
+
+
 def plot_waveform(wave_arr, plot_samples=1000, dur=1.0, sample_rate=44100):
+    # Note: The GUI draws its preview with get_min_max_columns() instead (no extra window).
+    # matplotlib is only imported when plotting, it is slow to import and not needed to play audio
+    import matplotlib.pyplot as plt
 
     # Only plot the first 1000 values
     # PLOT_SAMPLES = 1000
+    plot_samples = min(plot_samples, get_num_samples(dur, sample_rate), len(wave_arr))
 
-    # Generate time values (x-axis)
+    # Generate time values (x-axis), only for the plotted samples
     ts = 1.0/sample_rate  # time step size
-    seconds_start = 0
-    seconds_end = dur
-    t = np.arange(seconds_start, seconds_end, ts)
+    t = np.arange(plot_samples) * ts
 
-    plt.plot(t[0:plot_samples], wave_arr[0:plot_samples])
+    plt.plot(t, wave_arr[0:plot_samples])
     # plt.plot(t, wave_arr)
     # plt.plot(wave_arr)
     plt.ylabel('Amplitude')
@@ -377,6 +1953,190 @@ def map_function(value, from_low, from_high, to_low, to_high):
     return int(result)
 
 
+def benchmark_pulse_wave(durations=(1, 60, 3600), amp=16000, freq=50, duty_cycle=0.5, sample_rate=44100):
+    """
+    Times the old scipy.signal.square pulse generation against fill_pulse_wave() and prints the results.
+    Requires SciPy (only for the old version).
+
+    Note: The old version needs about 4 float64 arrays of the full duration (over 5 GB for 1 hour),
+          so it may run out of memory, which is printed instead of a time.
+
+    :param durations: seconds of pulse wave to generate for each run.
+    """
+    from scipy import signal
+
+    for dur in durations:
+        num_samples = get_num_samples(dur, sample_rate)
+
+        # Old version (what get_pulse_wave2() used to do)
+        try:
+            start_time = time.perf_counter()
+            t = np.arange(0, dur, 1.0 / sample_rate)
+            old_arr = (amp * signal.square(2.0 * np.pi * freq * t, duty=duty_cycle)).astype(np.int16)
+            old_time = time.perf_counter() - start_time
+            del t, old_arr
+            old_result = f"{old_time:.3f} s"
+        except MemoryError:
+            old_time = None
+            old_result = "MemoryError"
+
+        # New version
+        start_time = time.perf_counter()
+        new_arr = np.empty(num_samples, dtype=np.int16)
+        fill_pulse_wave(new_arr, amp, *get_pulse_samples(freq, duty_cycle, sample_rate))
+        new_time = time.perf_counter() - start_time
+        del new_arr
+
+        speedup = f", {old_time / new_time:.0f}x faster" if old_time else ""
+        print(f"{dur} s ({num_samples} samples): scipy.signal.square {old_result}, "
+              f"fill_pulse_wave {new_time:.3f} s{speedup}")
+
+
+def benchmark_dds(durations=(1, 60, 600), amp=16000, freq=50, sample_rate=44100):
+    """
+    Times get_sine_wave() against DDSOscillator.render() and prints the results,
+    including the largest difference between both waves (in LSB).
+
+    :param durations: seconds of sine wave to generate for each run.
+    """
+    for dur in durations:
+        num_samples = get_num_samples(dur, sample_rate)
+
+        start_time = time.perf_counter()
+        sine_arr, sine_snd = get_sine_wave(amp, freq, dur, sample_rate)
+        sine_time = time.perf_counter() - start_time
+
+        osc = DDSOscillator(amp, freq, sample_rate)
+        start_time = time.perf_counter()
+        dds_arr = osc.render(num_samples)
+        dds_time = time.perf_counter() - start_time
+
+        max_diff = np.abs(sine_arr.astype(np.int32) - dds_arr).max()
+        del sine_arr, sine_snd, dds_arr
+        print(f"{dur} s ({num_samples} samples): get_sine_wave {sine_time:.3f} s, "
+              f"DDSOscillator {dds_time:.3f} s, {sine_time / dds_time:.1f}x faster, max difference {max_diff} LSB")
+
+
+def benchmark_audio_latency(repeats=20, dur=1.0):
+    """
+    Measures call-to-sound latency (time from the call until the mixer is playing the sound), and prints the median:
+     - before: what play_audio2() used to do every burst (pygame.mixer.init(), make_sound(), Sound.play())
+     - after: audio_engine handing a Sound made once (make_sound()) to its reserved channel
+
+    Note: Does not include the audio device buffer latency (512 samples, about 12 msec), which is the same for both.
+          Also measures the very first mixer initialization, which the old code paid at the first burst.
+
+    :param repeats: an int, number of measurements.
+    :param dur: a float, unit: seconds, length of the sine wave played.
+    """
+    sine_arr, sine_snd = get_sine_wave(dur=dur)
+    audio_engine.stop()
+
+    # First playback ever, includes opening the audio device
+    start_time = time.perf_counter()
+    pygame.mixer.init(44100, -16, 1, 512, allowedchanges=MIXER_ALLOWED_CHANGES)
+    sound = pygame.sndarray.make_sound(get_mixer_array(sine_snd))
+    sound.play()
+    first_time = time.perf_counter() - start_time
+    sound.stop()
+
+    # Before: mixer.init() + make_sound() + play() every burst
+    before_times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        pygame.mixer.init(44100, -16, 1, 512, allowedchanges=MIXER_ALLOWED_CHANGES)
+        sound = pygame.sndarray.make_sound(get_mixer_array(sine_snd))
+        sound.play()
+        before_times.append(time.perf_counter() - start_time)
+        sound.stop()
+    pygame.mixer.quit()
+
+    # After: engine started once, Sound made once, only Channel.play() per burst
+    audio_engine.start()
+    sound = audio_engine.make_sound(sine_snd)
+    after_times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        audio_engine.channel.play(sound)
+        after_times.append(time.perf_counter() - start_time)
+        audio_engine.channel.stop()
+    audio_engine.stop()
+
+    print(f"First mixer init + play: {first_time * 1000:.4f} msec")
+    print(f"Before (init + make_sound + play per burst): {np.median(before_times) * 1000:.4f} msec")
+    print(f"After (audio_engine, Sound made once): {np.median(after_times) * 1000:.4f} msec")
+
+
+def benchmark_startup(budgets=None, repeats=3):
+    """
+    Startup benchmark (python -X importtime): imports each module in a new Python process,
+    prints how long the import took (fastest of repeats) against its budget,
+    and the slowest modules it imports directly (like the -X importtime report, in msec).
+    Run it after adding an import, so time to the first window stays low on the older lab laptops.
+
+    :param budgets: dictionary, module name: budget in seconds. STARTUP_BUDGETS_SEC if None.
+    :param repeats: an int, number of imports of each module (the first one also reads the files from disk).
+    :return: True if every module was imported within its budget.
+    """
+    # Only needed for this benchmark
+    import os
+    import subprocess
+    import sys
+
+    if budgets is None:
+        budgets = STARTUP_BUDGETS_SEC
+
+    # Same folder (and pygame message setting) as running the GUI
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+
+    is_within_budget = True
+    for module_name, budget_sec in budgets.items():
+        best_times = None
+        for _ in range(repeats):
+            result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+                                    cwd=source_dir, env=env, capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"{module_name}: import failed")
+                print(result.stderr.strip().splitlines()[-1])
+                best_times = None
+                break
+
+            # Lines: "import time: self [us] | cumulative | imported package" (indented 2 spaces per level).
+            # A package is listed after the packages it imports, so the direct imports of module_name
+            # are the second level lines since the previous top level line.
+            direct_imports = []
+            for line in result.stderr.splitlines():
+                if not line.startswith("import time:") or "self [us]" in line:
+                    continue
+                self_us, cumulative_us, name = line[len("import time:"):].split("|")
+                depth = (len(name) - len(name.lstrip()) - 1) // 2
+                cumulative_sec = int(cumulative_us) / 1000000
+                if depth == 1:
+                    direct_imports.append((cumulative_sec, name.strip()))
+                elif depth == 0:
+                    if name.strip() == module_name:
+                        break
+                    direct_imports = []
+            if best_times is None or cumulative_sec < best_times[0]:
+                best_times = (cumulative_sec, direct_imports)
+
+        if best_times is None:
+            is_within_budget = False
+            continue
+
+        import_time, direct_imports = best_times
+        status = "OK" if import_time <= budget_sec else "OVER BUDGET"
+        is_within_budget = is_within_budget and import_time <= budget_sec
+        print(f"{module_name}: {import_time * 1000:.0f} msec (budget {budget_sec * 1000:.0f} msec) {status}")
+
+        # Slowest direct imports of the module
+        for cumulative_sec, name in sorted(direct_imports, reverse=True)[:5]:
+            print(f"    {name}: {cumulative_sec * 1000:.1f} msec")
+
+    return is_within_budget
+
+
 def main2():
 
     # Test play_audio2(), will be used in combination of silence waiting
@@ -423,7 +2183,7 @@ def main():
     #   e.g. if you want 0.5 duty cycle (or 50%), pulse_width needs to be half of the period.
     # pulse_width = 250 # milliseconds, only used for duty cycle calculation
     # period = 500      # milliseconds, only used for duty cycle calculation
-    # pulse_count = 200 # unitless, but treat it as frequency, so Hz
+    # pulse_count = 200 # unitless, number of pulses in the train
     # burst = 4000      # milliseconds
     # duration = 2.0    # seconds
     # pulse_arr, pulse_snd = get_pulse_wave(period=period, pulse_width=pulse_width, pulse_count=pulse_count, dur=duration)
@@ -443,7 +2203,7 @@ def main():
     # --------------------------------
     # pulse_width = 10 # milliseconds, only used for duty cycle calculation
     # period = 500      # milliseconds, only used for duty cycle calculation
-    # pulse_count = 200 # unitless, but treat it as frequency, so Hz
+    # pulse_count = 200 # unitless, number of pulses in the train
     # burst = 1000      # milliseconds
     # duration = 1.0    # seconds
     #
@@ -491,6 +2251,53 @@ def main():
     #     play_audio(square_snd, burst=1000)
     #     # TODO: Put in way to smartly detect duty cycle and choose plot sample so square wave is visible?
 
+    # --------------------------------
+    # Test pulse train streaming (pulse_count pulses, only one block in memory)
+    # --------------------------------
+    # pulse_stream = stream_pulse_train(period=500, pulse_width=250, pulse_count=32000)
+    # pygame.mixer.init(44100, -16, 1, 512, allowedchanges=MIXER_ALLOWED_CHANGES)
+    # play_stream(pulse_stream, playback_time=4000)
+
+    # --------------------------------
+    # Benchmark pulse wave generation (scipy.signal.square vs fill_pulse_wave)
+    # --------------------------------
+    # benchmark_pulse_wave()
+
+    # --------------------------------
+    # Benchmark sine wave generation (get_sine_wave vs DDSOscillator)
+    # --------------------------------
+    # benchmark_dds()
+
+    # --------------------------------
+    # Benchmark call-to-sound latency (pygame.mixer.init() per playback vs AudioEngine)
+    # --------------------------------
+    # benchmark_audio_latency()
+
+    # --------------------------------
+    # Benchmark startup (import time of the GUI and the command line runner against their budgets)
+    # --------------------------------
+    # benchmark_startup()
+
+    # --------------------------------
+    # Frequency sweep: generate every step in one call (get_wave_batch), then play them in order
+    # --------------------------------
+    # START_FREQ = 10
+    # STOP_FREQ = 100
+    # STEP_FREQ = 10
+    # waves = get_wave_batch(SINE_WAVE, amps=16000, freqs=np.arange(START_FREQ, STOP_FREQ, STEP_FREQ), dur=2.0)
+    # for wave in waves:
+    #     play_audio(wave, burst=2000)
+
+    # --------------------------------
+    # Streaming backend: play a 1 hour sine wave with only the ring buffer in memory,
+    # the frequency changes after 10 sec (at the next block)
+    # --------------------------------
+    # set_audio_backend(AUDIO_BACKEND_STREAM)
+    # osc = DDSOscillator(amp=16000, freq=50, block_size=STREAM_CALLBACK_SAMPLES)
+    # threading.Timer(10, osc.set_freq, args=(100,)).start()
+    # play_audio2(osc.stream(60 * 60), playback_time=60 * 60 * 1000)
+    # set_audio_backend(AUDIO_BACKEND_MIXER)
+
     # --------------------------------
     # Test map_function
     # --------------------------------